@@ -0,0 +1,78 @@
+"""
+Decode throughput benchmark: typed UserActivityRecord decoding vs the per-row json path.
+
+The per-row path is what consumers did before the decoder existed: decode the cell bytes to str,
+json.loads into a dict, then parse RecordedSystemTime / RecordedDisplayTime where times are needed.
+Both paths start from raw cell bytes and end with parsed times.
+
+Run from the bq-agent-app directory:
+    python benchmarks/decode_records.py --records 200000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from subagent_phone_user_activity.decoder import decode_batch
+from subagent_phone_user_activity.records import parse_timestamp
+
+SUBTYPES = ["Pairing Transmitter Started", "Pairing Transmitter Failed", "Network Lost", "Network Restored", "Low Battery"]
+
+
+def make_values(n):
+    random.seed(0)
+    values = []
+    start = 1746100800
+    for i in range(n):
+        ts = start + i * 3
+        values.append(json.dumps({
+            "Stream": random.choice(["iOS", "Android"]),
+            "RecordedSystemTime": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(ts)) + ".1234567Z",
+            "RecordedDisplayTime": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(ts - 7 * 3600)) + ".1234567-07:00",
+            "UseractivityType": "Networking",
+            "UseractivitySubType": random.choice(SUBTYPES),
+            "Data": json.dumps({"State": "Connected", "OSVersion": "17.4.1", "Signal": random.randint(0, 5)}),
+            "TransmitterNumber": "8G1234",
+            "RecordType": "UserActivityRecord",
+        }).encode("utf-8"))
+    return values
+
+
+def per_row_json(values):
+    records = []
+    for value in values:
+        record = json.loads(value.decode("utf-8"))
+        parse_timestamp(record.get("RecordedSystemTime"))
+        parse_timestamp(record.get("RecordedDisplayTime"))
+        records.append(record)
+    return records
+
+
+def best_of(fn, values, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(values)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(n=200000, repeat=3):
+    values = make_values(n)
+    for name, fn in (("per-row json.loads", per_row_json), ("decode_batch", decode_batch)):
+        elapsed = best_of(fn, values, repeat)
+        size = sys.getsizeof(fn(values[:1])[0])
+        print(f"{name:>20}: {n / elapsed:,.0f} records/s ({elapsed:.2f}s for {n:,}), {size} bytes per record object")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=200000, help="number of synthetic records")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per path; the best is reported")
+    args = parser.parse_args()
+    main(args.records, args.repeat)
@@ -0,0 +1,70 @@
+"""
+Cold-start benchmark for the agent packages.
+
+Each run starts a fresh interpreter and measures, for every package:
+  - import_ms: importing the package itself (what listing agents pays),
+  - root_agent_ms: resolving `root_agent` (what the first request pays),
+  - rss_mb: peak resident memory growth while doing both,
+  - modules: number of modules loaded, and whether the Bigtable client was imported.
+
+Run from the bq-agent-app directory:
+    python benchmarks/import_time.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PACKAGES = ["phone_user_activity_agent", "subagent_phone_user_activity"]
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = """
+import json, resource, sys, time
+before_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+before_modules = len(sys.modules)
+t0 = time.perf_counter()
+import {package} as package
+t1 = time.perf_counter()
+root_agent = package.agent.root_agent
+t2 = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (t1 - t0) * 1000,
+    "root_agent_ms": (t2 - t1) * 1000,
+    "rss_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before_rss) / 1024,
+    "modules": len(sys.modules) - before_modules,
+    "bigtable_loaded": "google.cloud.bigtable" in sys.modules,
+}}))
+"""
+
+
+def probe(package: str):
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(package=package)],
+        cwd=APP_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(runs=5):
+    for package in PACKAGES:
+        results = [probe(package) for _ in range(runs)]
+        print(
+            f"{package}: "
+            f"import {statistics.median(r['import_ms'] for r in results):.1f} ms, "
+            f"root_agent {statistics.median(r['root_agent_ms'] for r in results):.1f} ms, "
+            f"rss +{statistics.median(r['rss_mb'] for r in results):.1f} MB, "
+            f"{results[0]['modules']} modules, "
+            f"bigtable loaded: {results[0]['bigtable_loaded']}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per package; medians are reported")
+    args = parser.parse_args()
+    main(args.runs)
@@ -1,11 +1,4 @@
 from google.adk.agents import Agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.genai import types
-from google.cloud import bigtable
-from google.cloud.bigtable.row_set import RowSet
-
-import google.auth
 
 
 APP_NAME = "phone_activity_app"
@@ -35,6 +28,8 @@ def get_phone_logs(patient_id: str, start_time: int, end_time: int, logType: str
     Returns:
         string: JSON-formatted data of phone user activity records, or None if an error occurs.
     """
+    from google.cloud import bigtable
+    from google.cloud.bigtable.row_set import RowSet
     
     project_id="qwiklabs-asl-01-e660751acd56"
     instance_id="phonelogs"
@@ -50,7 +45,9 @@ def get_phone_logs(patient_id: str, start_time: int, end_time: int, logType: str
     table = instance.table(table_id)
 
     start_key = f"{patient_id}#UserActivityRecord#{start_time}"
-    end_key = f"{patient_id}#UserActivityRecord#{end_time}"
+    # end_time is inclusive and the end key exclusive, so the range ends at the next second. This covers the same
+    # rows as subagent_phone_user_activity.rowkeys.time_range; the agent stays self-contained.
+    end_key = f"{patient_id}#UserActivityRecord#{int(end_time) + 1}"
     
     column_family_id = "raw"
     column_id = "Raw".encode("utf-8")
@@ -85,6 +82,9 @@ root_agent = Agent(
 
 # Session and Runner
 async def setup_session_and_runner():
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+
     session_service = InMemorySessionService()
     session = await session_service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID)
     runner = Runner(agent=root_agent, app_name=APP_NAME, session_service=session_service)
@@ -92,6 +92,8 @@ async def setup_session_and_runner():
 
 # Agent Interaction
 async def call_agent_async():
+    from google.genai import types
+
     content = types.Content(role='user', parts=[types.Part(text=query)])
     session, runner = await setup_session_and_runner()
     events = runner.run_async(user_id=USER_ID, session_id=SESSION_ID, new_message=content)
@@ -14,6 +14,7 @@ def main(project_id="qwiklabs-asl-01-e660751acd56", instance_id="phonelogs", tab
     # Open an existing table.
     table = instance.table(table_id)
 
+    # The end key is exclusive, so this reads every row of the second 1746141133 (including "...#1746141133#n" keys).
     start_key = "010ceb22-8933-4668-974b-0956fceb8644#UserActivityRecord#1746141133"
     end_key = "010ceb22-8933-4668-974b-0956fceb8644#UserActivityRecord#1746141134"
     
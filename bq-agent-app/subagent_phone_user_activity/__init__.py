@@ -1 +1,10 @@
-from . import agent
+import importlib
+
+# The agent module is imported on first access (e.g. by the ADK loader reading `agent.root_agent`), not when the
+# package is imported, so listing agents does not pay for loading the ADK, genai and Bigtable client libraries.
+def __getattr__(name):
+    if name == "agent":
+        return importlib.import_module(".agent", __name__)
+    if name == "root_agent":
+        return importlib.import_module(".agent", __name__).root_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,22 +1,28 @@
-from google.adk.agents import Agent, SequentialAgent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
+from google.adk.agents import Agent
 from google.adk.tools.tool_context import ToolContext
-from google.genai import types
-from google.cloud import bigtable
-from google.cloud.bigtable.row_set import RowSet
 
-import google.auth
 import json
 
+from .dataset import get_dataset, make_dataset_key, start_dataset
+from .export import export_patient_range, resolve_export_dir
+from .fleet import fleet_scan
+from .prefetch import PREFETCH_ENABLED, get_prefetcher, window_cache
+from .progress import add_progress_listener, remove_progress_listener, report_progress
+from .query import run_query
+from .read_executor import get_read_stats, read_rows_resilient
+from .records import format_timestamp
+from .rowkeys import time_range
+from .sampling import MAX_SAMPLED_RECORDS, stratified_sample
+from .tail import get_tail
+from .table import BT_INSTANCE_ID, BT_TABLE_ID, PROJECT_ID, get_table, raw_value
+
 APP_NAME = "phone_activity_app"
 USER_ID = "1234"
 SESSION_ID = "session1234"
 MODEL = "gemini-2.0-flash"
 
-PROJECT_ID="qwiklabs-asl-01-e660751acd56"
-BT_INSTANCE_ID="phonelogs"
-BT_TABLE_ID="phone_user_activity"
+PROGRESS_EVERY_N_ROWS = 1000
+MAX_SEARCH_RESULTS = 50
 
 ##### TOOL FOR MAIN AGENT
 def get_records_bigtable(patient_id: str, start_time: int, end_time: int, recordType: str, tool_context: ToolContext):
@@ -33,37 +39,121 @@ def get_records_bigtable(patient_id: str, start_time: int, end_time: int, record
     Returns:
         string: JSON-formatted data of phone user activity records, or None if an error occurs.
     """
+    from google.api_core.exceptions import GoogleAPICallError
     
-    client = bigtable.Client(project=PROJECT_ID)
-    instance = client.instance(BT_INSTANCE_ID)
-    table = instance.table(BT_TABLE_ID)
+    table = get_table()
 
-    start_key = f"{patient_id}#{recordType}#{start_time}"
-    end_key = f"{patient_id}#{recordType}#{end_time}"
+    # end_time is inclusive: the range ends after every row of the end_time second.
+    try:
+        start_key, end_key = time_range(patient_id, recordType, start_time, end_time)
+    except ValueError as e:
+        return f"Error: invalid lookup ({e}). Check the patient id, record type and that start_time is before end_time."
     
     print(f"row key for lookup: {start_key}")
     
-    column_family_id = "raw"
-    column_id = "Raw".encode("utf-8")
-    
-    row_set = RowSet()
-    row_set.add_row_range_from_keys(start_key, end_key)
-    
-    rows = table.read_rows(row_set=row_set)
+    report_progress("fetch", f"reading {recordType} rows for {patient_id}", start_key=start_key, end_key=end_key)
+    dataset_key = make_dataset_key(patient_id, recordType, start_time, end_time)
+    dataset = start_dataset(dataset_key)
+    cached = window_cache.get((patient_id, recordType, start_time, end_time)) if PREFETCH_ENABLED else None
+    if cached is not None:
+        report_progress("fetch", f"using {len(cached):,} prefetched rows", rows=len(cached), cache_hit=True)
+        rows = iter(cached)
+    else:
+        rows = ((row.row_key.decode("utf-8"), raw_value(row)) for row in read_rows_resilient(table, start_key, end_key))
     readableRows = []
-    for row in rows:
-        readableRow = row.cells[column_family_id][column_id][0].value.decode("utf-8")
-        #print(readableRow)
-        readableRows.append(readableRow)
+    batch, batch_keys = [], []
+    row_key = None
+    try:
+        for row_key, value in rows:
+            readableRows.append(value.decode("utf-8"))
+            batch.append(value)
+            batch_keys.append(row_key)
+            if len(batch) == PROGRESS_EVERY_N_ROWS:
+                dataset.add_batch(batch, batch_keys)
+                batch, batch_keys = [], []
+                report_progress("fetch", f"fetched {len(readableRows):,} rows", rows=len(readableRows))
+        dataset.add_batch(batch, batch_keys)
+    except GoogleAPICallError as e:
+        print(f"read failed after {len(readableRows)} rows: {e} {get_read_stats()}")
+        return f"Error: the Bigtable read failed or timed out after {len(readableRows)} records ({e}). Try a smaller time range."
+    report_progress("fetch", f"fetched {len(readableRows):,} rows (done)", rows=len(readableRows), done=True)
     
     # Update the state with the results, don't return it.
     tool_context.state["phone_logs"] = readableRows
+    tool_context.state["dataset_key"] = dataset_key
+    # last_row_key lets check_new_records continue after the loaded rows even if the dataset has to be rebuilt.
+    tool_context.state["lookup"] = {
+        "patient_id": patient_id, "recordType": recordType, "start_time": start_time, "end_time": end_time, "last_row_key": row_key
+    }
+    if PREFETCH_ENABLED:
+        get_prefetcher().schedule_around(patient_id, recordType, start_time, end_time)
     return f"Successfully fetched {len(readableRows)} phone log records. They are now available for observation."
 
+def check_new_records(tool_context: ToolContext):
+    """
+    Live monitoring: fetches only the records of the current patient and record type that arrived after the last loaded record,
+    adds them to 'phone_logs', and reports spike alerts for subtypes that are bursting. Use it when the user wants to watch or
+    monitor a device, or asks "anything new?", instead of re-reading the whole range.
+
+    Args:
+        tool_context (dict): The agent's ToolContext, which contains session state, automatically injected by the runner.
+    Returns:
+        string: JSON-formatted count of new records, the new total and any spike alerts.
+    """
+    from google.api_core.exceptions import GoogleAPICallError
+
+    lookup = tool_context.state.get("lookup")
+    dataset = get_dataset(tool_context.state)
+    if not lookup or dataset is None:
+        return "Error: No phone logs have been loaded into the cache. Use the 'get_records_bigtable' tool first."
+
+    tail = get_tail(dataset, lookup["patient_id"], lookup["recordType"], lookup["start_time"], lookup.get("last_row_key"))
+    try:
+        new_rows, alerts = tail.poll()
+    except GoogleAPICallError as e:
+        return f"Error: the Bigtable read for new records failed ({e})."
+    if new_rows:
+        tool_context.state["phone_logs"] = tool_context.state["phone_logs"] + new_rows
+        tool_context.state["lookup"] = dict(lookup, last_row_key=tail.cursor)
+    return json.dumps({"new_records": len(new_rows), "total_records": len(dataset), "alerts": alerts})
+
+def export_records_parquet(patient_id: str, start_time: int, end_time: int, recordType: str, output_dir: str):
+    """
+    Exports a patient's records straight from Bigtable to partitioned, compressed Parquet files (one per UTC day) for offline analysis.
+    Every day the time range touches is exported whole. Use it only when the user asks to export or download data. Re-running an export
+    skips days that were already written completely and rewrites days that were still in progress.
+
+    Args:
+        patient_id (str): a UUID for a given patient
+        start_time (int): a timestamp in unix seconds
+        end_time (int): a timestamp in unix seconds
+        recordType (str): a label for the record type
+        output_dir (str): subdirectory of the export root to write the Parquet files to, e.g. "" or "pairing_issue"
+
+    Returns:
+        string: JSON-formatted number of files and rows written.
+    """
+    from google.api_core.exceptions import GoogleAPICallError
+
+    try:
+        summary = export_patient_range(patient_id, recordType, start_time, end_time, resolve_export_dir(output_dir))
+    except (ImportError, GoogleAPICallError, OSError, ValueError) as e:
+        return f"Error: export failed ({e})."
+    return json.dumps({
+        "files": summary["files"],
+        "skipped_existing": summary["skipped"],
+        "partial_days": summary["partial_days"],
+        "rows": summary["rows"],
+        "paths": [r["path"] for r in summary["results"]],
+    })
+
 ##### TOOL FOR OBSERVATION AGENT
 def make_observation(tool_context: ToolContext):
     """
     Makes an observation about the 'phone_logs' in state given the user's question. 
+    If more records are loaded than fit in one response, a representative sample of at most 2000 records is returned instead:
+    rare subtypes are kept, detected bursts and dense subtypes are sampled over time, "strata" holds the exact per-subtype
+    counts and "bursts" the exact count of every burst minute.
 
     Args:
         tool_context (dict): The agent's ToolContext, which contains session state, automatically injected by the runner.
@@ -75,17 +165,94 @@ def make_observation(tool_context: ToolContext):
     if not phone_logs:
         return "Error: No phone logs have been loaded into the cache. Use the 'get_records_bigtable' tool first."
 
+    if len(phone_logs) > MAX_SAMPLED_RECORDS:
+        dataset = get_dataset(tool_context.state)
+        report_progress("sample", f"downsampling {len(dataset):,} records for the observation agent", rows=len(dataset))
+        sample = stratified_sample(dataset.records)
+        report_progress("observe", f"handing {sample['returned']:,} of {sample['total']:,} records to the observation agent", rows=sample["returned"])
+        return json.dumps(sample)
+
+    report_progress("observe", f"handing {len(phone_logs):,} records to the observation agent", rows=len(phone_logs))
     # print(f"DEBUG: Retrieving {len(phone_logs)} logs from state for agent analysis.")
     # Return the logs. The agent will use this output for its reasoning.
     # We join them into a single string to return, as tools return strings.
     return json.dumps(phone_logs)
+
+
+def query_logs(query: str, tool_context: ToolContext):
+    """
+    Runs an exact filter / group-by / time-bucket / top-k query over the 'phone_logs' in state and returns only the result rows.
+    Prefer this over make_observation for counting, filtering and finding spikes.
+
+    The query is a comma separated list of clauses, for example:
+      filter type=Networking, subtype~"Pairing Transmitter*", bucket=5m, count, top 10
+
+    Clauses:
+      filter <field><op><value> [and ...]: op is = or != (case-insensitive), ~ or !~ (glob with *), > >= < <= (times or numbers)
+      by <field> [<field> ...]: group and count by fields
+      bucket=<n><s|m|h|d>: group and count by time bucket of RecordedSystemTime
+      count: return counts instead of records
+      top <n>: keep the n largest groups
+      fields <field> [<field> ...]: columns to return when listing records
+      limit <n>: maximum number of rows returned
+    Fields: type, subtype, stream, transmitter, data, time (RecordedSystemTime), displaytime, recordtype.
+
+    Args:
+        query (str): the query string
+        tool_context (dict): The agent's ToolContext, which contains session state, automatically injected by the runner.
+    Returns:
+        string: JSON-formatted query result with matched/total counts and the result rows.
+    """
+    dataset = get_dataset(tool_context.state)
+
+    if dataset is None:
+        return "Error: No phone logs have been loaded into the cache. Use the 'get_records_bigtable' tool first."
+
+    try:
+        result = run_query(dataset.records, query)
+    except ValueError as e:
+        return f"Error: invalid query: {e}"
+    report_progress("aggregate", f"query matched {result['matched']:,} of {result['total']:,} records", rows=result["matched"])
+    return json.dumps(result)
     
 
+def search_logs(query: str, start_time: int, end_time: int, tool_context: ToolContext):
+    """
+    Full-text search over the Data field of the 'phone_logs' in state. Use it to answer questions like "when did error X first show up?"
+    without reading every record. All parts of the query must match: plain words, "quoted phrases" and prefix* terms are supported.
+
+    Args:
+        query (str): search terms, e.g. "connection timed out" or ios* "no network"
+        start_time (int): optional lower bound in unix seconds, 0 for no bound
+        end_time (int): optional upper bound in unix seconds, 0 for no bound
+        tool_context (dict): The agent's ToolContext, which contains session state, automatically injected by the runner.
+    Returns:
+        string: JSON-formatted match count, first/last match times, matching record ids and the first matching records.
+    """
+    dataset = get_dataset(tool_context.state)
+
+    if dataset is None:
+        return "Error: No phone logs have been loaded into the cache. Use the 'get_records_bigtable' tool first."
+
+    record_ids = dataset.index.search(query, start_time=start_time or None, end_time=end_time or None)
+    times = [dataset.index.timestamp(i) for i in record_ids]
+    times = [t for t in times if t is not None]
+    result = {
+        "query": query,
+        "count": len(record_ids),
+        "first_seen": format_timestamp(min(times)) if times else None,
+        "last_seen": format_timestamp(max(times)) if times else None,
+        "record_ids": record_ids[:MAX_SEARCH_RESULTS],
+        "records": [dataset.records[i].to_dict() for i in record_ids[:5]],
+    }
+    return json.dumps(result)
+
+
 ##### SUB AGENT FOR ONLY QUESTIONS ABOUT THE PHONE LOGS
 observation_agent = Agent(
     model=MODEL,
     name="observation_agent",
-    instruction="""Handles general observations about the phone logs using the 'make_observation' tool. Contents of a user activity record are json-formatted, and contain the following keys:
+    instruction="""Handles general observations about the phone logs using the 'query_logs', 'search_logs' and 'make_observation' tools. Use 'query_logs' for counts, breakdowns, filtering and spike detection so the numbers are exact. Use 'search_logs' to find when a specific error message, OS version or network state appears in the Data field. Only use 'make_observation' when you need to read the raw records. Contents of a user activity record are json-formatted, and contain the following keys:
     
       "Stream": Enum identifier for the device and operating system,
       "RecordedSystemTime": UTC representation of the recorded display time,
@@ -100,12 +267,17 @@ observation_agent = Agent(
     """,
     description="""You are the general observations agent. You make observations about the 'phone_logs' found in state. Do NOT do anything if 'phone_logs' has not been populated. Start with a general summary of what you see when the data has been returned from the read_agent based off the Data field. Also provide a breakdown with counts of UserActivitySubTypes grouped by UserActivityTypes.
     """,
-    tools=[make_observation]
+    tools=[query_logs, search_logs, make_observation]
 )
 
 
 # Session and Runner
+# The runner, session service and genai types are only needed to drive the agent from a script or notebook,
+# so they are imported on first use instead of when the agent is loaded.
 async def setup_session_and_runner():
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+
     initial_state = {"phone_logs": []}  # Store the phone logs we initially query in state.
     session_service = InMemorySessionService()
     session = await session_service.create_session(
@@ -117,16 +289,105 @@ async def setup_session_and_runner():
     runner = Runner(agent=root_agent, app_name=APP_NAME, session_service=session_service)
     return session, runner
 
+def _translate_event(event):
+    """
+    Converts an ADK event into the plain dict events yielded by stream_agent_async.
+    """
+    out = []
+    if event.partial:
+        for part in (event.content.parts if event.content and event.content.parts else []):
+            if part.text:
+                out.append({"type": "partial", "author": event.author, "text": part.text})
+        return out
+
+    for call in event.get_function_calls():
+        out.append({"type": "tool_call", "author": event.author, "name": call.name, "args": dict(call.args or {})})
+    for response in event.get_function_responses():
+        out.append({"type": "tool_result", "author": event.author, "name": response.name})
+    if event.is_final_response() and event.content and event.content.parts:
+        text = "".join(part.text for part in event.content.parts if part.text)
+        out.append({"type": "final", "author": event.author, "text": text})
+    return out
+
+
 # Agent Interaction
-async def call_agent_async():
+async def stream_agent_async(query: str, on_event=None):
+    """
+    Runs the agent on a query and yields events as they happen instead of waiting for the final response.
+
+    Yielded events are dicts with a "type" key:
+      "partial": a chunk of model text as it is generated,
+      "tool_call" / "tool_result": a sub agent started or finished a tool,
+      "progress": structured progress reported by a tool (e.g. "fetched 12,400 rows"),
+      "final": the complete final response text.
+
+    Args:
+        query (str): the user's question
+        on_event (callable): optional SSE-style callback that receives every event as soon as it is produced,
+            including progress reported while a tool is still running.
+    """
+    from google.adk.agents.run_config import RunConfig, StreamingMode
+    from google.genai import types
+
     content = types.Content(role='user', parts=[types.Part(text=query)])
     session, runner = await setup_session_and_runner()
-    events = runner.run_async(user_id=USER_ID, session_id=SESSION_ID, new_message=content)
 
-    async for event in events:
-        if event.is_final_response():
-            final_response = event.content.parts[0].text
-            print("Agent Response: ", final_response)
+    pending = []
+    def forward_progress(event):
+        pending.append(event)
+        if on_event:
+            on_event(event)
+
+    add_progress_listener(forward_progress)
+    try:
+        events = runner.run_async(
+            user_id=USER_ID,
+            session_id=SESSION_ID,
+            new_message=content,
+            run_config=RunConfig(streaming_mode=StreamingMode.SSE),
+        )
+        async for event in events:
+            while pending:
+                yield pending.pop(0)
+            for out in _translate_event(event):
+                if on_event:
+                    on_event(out)
+                yield out
+        while pending:
+            yield pending.pop(0)
+    finally:
+        remove_progress_listener(forward_progress)
+
+
+async def call_agent_async(query: str, stream: bool = True):
+    if not stream:
+        from google.genai import types
+
+        content = types.Content(role='user', parts=[types.Part(text=query)])
+        session, runner = await setup_session_and_runner()
+        events = runner.run_async(user_id=USER_ID, session_id=SESSION_ID, new_message=content)
+
+        async for event in events:
+            if event.is_final_response():
+                final_response = event.content.parts[0].text
+                print("Agent Response: ", final_response)
+        return
+
+    streamed_text = False
+    async for event in stream_agent_async(query):
+        if event["type"] == "partial":
+            print(event["text"], end="", flush=True)
+            streamed_text = True
+        elif event["type"] == "progress":
+            print(f"\n[{event['stage']}] {event['message']}", flush=True)
+        elif event["type"] == "tool_call":
+            print(f"\n[{event['author']}] calling {event['name']}", flush=True)
+        elif event["type"] == "final":
+            if streamed_text:
+                print()
+            else:
+                print("Agent Response: ", event["text"])
+            streamed_text = False
 
             
 read_agent = Agent(
@@ -140,9 +401,15 @@ read_agent = Agent(
     anything about errors - use ErrorLogRecord for the recordtype.
     egv, glucose - use GlucoseRecord for the recordtype.
     meter - use MeterRecord for the recordtype.
+    If the user asks a question across patients without giving a patient id (for example which patients saw pairing failures on a transmitter), use the fleet_scan tool instead of get_records_bigtable.
+    If the user asks to export or download records to Parquet, use export_records_parquet.
+    If the user wants to monitor the loaded patient's device or asks whether there is anything new, use check_new_records instead of reading the range again.
     """,
     tools=[
-       get_records_bigtable
+       get_records_bigtable,
+       fleet_scan,
+       check_new_records,
+       export_records_parquet
     ]
 )
 
@@ -153,7 +420,7 @@ root_agent = Agent(
     description=(
         "Agent that routes requests"
     ),
-    instruction="""You are an agent that has access to a read_agent and an observation_agent. Based off the request, when the user asks for data using a patient, record type, and date range, you should use the read_agent. If the user asks for further analysis of the data, only use the observation_agent. If the user provides a new date range, a new patient id, or a new RecordType do a new lookup for data with the read_agent.""",
+    instruction="""You are an agent that has access to a read_agent and an observation_agent. Based off the request, when the user asks for data using a patient, record type, and date range, or asks a question across all patients, you should use the read_agent. If the user asks for further analysis of the data, only use the observation_agent. If the user provides a new date range, a new patient id, or a new RecordType do a new lookup for data with the read_agent.""",
     sub_agents=[
         read_agent,
         observation_agent
@@ -0,0 +1,97 @@
+import json
+from collections import OrderedDict
+
+from .decoder import decode_batch
+from .search_index import InvertedIndex
+
+# Decoded records and their search index live in process memory, keyed by the dataset key stored in
+# session state. Session state only holds json-serializable values ('phone_logs'), so if a dataset was
+# evicted or the process restarted it is rebuilt from 'phone_logs' on first use.
+MAX_DATASETS = 8
+_datasets = OrderedDict()
+
+
+def make_dataset_key(patient_id: str, recordType: str, start_time: int, end_time: int) -> str:
+    return f"{patient_id}#{recordType}#{start_time}#{end_time}"
+
+
+class Dataset:
+    """
+    Records loaded for one patient / record type / time range, with an inverted index over their Data payloads.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.rows_loaded = 0
+        self.row_keys = []
+        self.records = []
+        self.index = InvertedIndex()
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, raw, row_key: str = None):
+        """
+        Decodes one raw record and indexes it. Returns the record id, or None if the row is not valid json.
+        """
+        return self.add_batch([raw], [row_key])[0]
+
+    def add_batch(self, raws, row_keys=None):
+        """
+        Decodes a batch of raw values (bytes or str) and indexes them. Returns the record ids, None for rows that are not valid json.
+        """
+        if row_keys is None:
+            row_keys = [None] * len(raws)
+        record_ids = []
+        for record, row_key in zip(decode_batch(raws), row_keys):
+            self.rows_loaded += 1
+            if record is None:
+                record_ids.append(None)
+                continue
+            record_id = len(self.records)
+            data = record.Data
+            if data is not None and not isinstance(data, str):
+                data = json.dumps(data)
+            self.index.add(record_id, record.system_ts, data)
+            self.records.append(record)
+            self.row_keys.append(row_key)
+            record_ids.append(record_id)
+        return record_ids
+
+
+def start_dataset(key: str) -> Dataset:
+    """
+    Creates and registers an empty dataset, replacing any previous one with the same key.
+    """
+    dataset = Dataset(key)
+    _datasets[key] = dataset
+    _datasets.move_to_end(key)
+    while len(_datasets) > MAX_DATASETS:
+        _datasets.popitem(last=False)
+    return dataset
+
+
+def is_registered(dataset: Dataset) -> bool:
+    """
+    Whether the dataset is still the registered one for its key, i.e. has not been evicted or replaced.
+    """
+    return _datasets.get(dataset.key) is dataset
+
+
+def get_dataset(state):
+    """
+    Returns the Dataset for the 'phone_logs' currently in session state, rebuilding it if needed.
+    Returns None when nothing has been loaded.
+    """
+    phone_logs = state.get("phone_logs")
+    if not phone_logs:
+        return None
+    key = state.get("dataset_key") or f"unkeyed#{len(phone_logs)}#{hash(phone_logs[0])}"
+    dataset = _datasets.get(key)
+    if dataset is not None and dataset.rows_loaded == len(phone_logs):
+        _datasets.move_to_end(key)
+        return dataset
+
+    dataset = start_dataset(key)
+    dataset.add_batch(phone_logs)
+    return dataset
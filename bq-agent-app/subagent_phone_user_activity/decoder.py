@@ -0,0 +1,164 @@
+import json
+import re
+from datetime import timedelta, timezone
+
+from .records import RECORD_FIELDS, parse_timestamp
+
+# Schema of a raw:Raw user activity value:
+#
+#   "Stream": Enum identifier for the device and operating system,
+#   "RecordedSystemTime": UTC representation of the recorded display time,
+#   "RecordedDisplayTime": datetimeoffset expressed as string of the event that occurred on the device,
+#   "UseractivityType": category of log types,
+#   "UseractivitySubType": subcategory of UseractivityType,
+#   "Data": raw logs of the event expressed as a key-value pair in JSON format,
+#   "TransmitterNumber": unique identifier for transmitter device,
+#   "RecordType": the record type, e.g. UserActivityRecord
+#
+# Values are decoded once into compact UserActivityRecord structs with the times already parsed, instead of
+# every consumer calling json.loads and re-parsing timestamps on its own.
+
+_OFFSET_RE = re.compile(r"(Z|[+-]\d{2}:?\d{2})$")
+_offsets = {"Z": timezone.utc}
+_offset_seconds = {"Z": 0, "": 0}
+_minute_seconds = {}
+_MAX_CACHED_MINUTES = 100000
+
+
+def _offset(suffix: str):
+    """
+    Returns the tzinfo for an offset suffix like "-07:00", parsed once per distinct offset.
+    """
+    tz = _offsets.get(suffix)
+    if tz is None:
+        sign = -1 if suffix[0] == "-" else 1
+        digits = suffix[1:].replace(":", "")
+        tz = _offsets[suffix] = timezone(sign * timedelta(hours=int(digits[:2]), minutes=int(digits[2:])))
+    return tz
+
+
+def _offset_to_seconds(suffix: str):
+    seconds = _offset_seconds.get(suffix)
+    if seconds is None:
+        seconds = _offset_seconds[suffix] = int(_offset(suffix).utcoffset(None).total_seconds())
+    return seconds
+
+
+def _iso_seconds(text):
+    """
+    Fast path for "YYYY-MM-DDTHH:MM:SS[.fffffff][Z|+hh:mm|+hhmm]" strings: everything up to the minute and the
+    offset are each parsed once and cached, the rest is slicing. Falls back to parse_timestamp otherwise.
+    """
+    if not isinstance(text, str) or len(text) < 19 or text[16] != ":":
+        return parse_timestamp(text)
+    minute = text[:16]
+    minute_start = _minute_seconds.get(minute)
+    if minute_start is None:
+        minute_start = parse_timestamp(minute + ":00+00:00")
+        if minute_start is None:
+            return None
+        if len(_minute_seconds) >= _MAX_CACHED_MINUTES:
+            _minute_seconds.clear()
+        _minute_seconds[minute] = minute_start
+
+    rest = text[19:]
+    if rest.endswith("Z"):
+        offset, fraction = 0, rest[:-1]
+    elif len(rest) >= 6 and rest[-6] in "+-" and rest[-3] == ":":
+        offset, fraction = _offset_to_seconds(rest[-6:]), rest[:-6]
+    elif len(rest) >= 5 and rest[-5] in "+-":
+        offset, fraction = _offset_to_seconds(rest[-5:]), rest[:-5]
+    else:
+        offset, fraction = 0, rest
+    # Anything but ".digits" left over (e.g. an offset the cases above do not know) goes to the full parser.
+    if fraction and not (fraction[0] == "." and fraction[1:].isdigit()):
+        return parse_timestamp(text)
+    seconds = text[17:19]
+    if not seconds.isdigit():
+        return parse_timestamp(text)
+    return minute_start + int(seconds) + (float(fraction) if fraction else 0.0) - offset
+
+
+class UserActivityRecord:
+    """
+    One decoded record. Supports record.get("UseractivitySubType") like the json dicts it replaces.
+
+    system_ts: RecordedSystemTime in unix seconds (None if missing or unparseable).
+    display_ts: RecordedDisplayTime in unix seconds.
+    display_tz: the device's UTC offset from RecordedDisplayTime as a tzinfo, or None.
+    """
+
+    __slots__ = tuple(RECORD_FIELDS) + ("system_ts", "display_ts", "display_tz")
+
+    def __init__(self, values: dict):
+        get = values.get
+        self.Stream = get("Stream")
+        self.RecordedSystemTime = get("RecordedSystemTime")
+        self.RecordedDisplayTime = get("RecordedDisplayTime")
+        self.UseractivityType = get("UseractivityType")
+        self.UseractivitySubType = get("UseractivitySubType")
+        self.Data = get("Data")
+        self.TransmitterNumber = get("TransmitterNumber")
+        self.RecordType = get("RecordType")
+        self.system_ts = _iso_seconds(self.RecordedSystemTime)
+        self.display_ts = _iso_seconds(self.RecordedDisplayTime)
+        self.display_tz = None
+        display = self.RecordedDisplayTime
+        if isinstance(display, str) and len(display) > 19:
+            suffix = display[-6:] if display[-6] in "+-" else display[-1]
+            self.display_tz = _offsets.get(suffix)
+            if self.display_tz is None:
+                match = _OFFSET_RE.search(display)
+                if match:
+                    self.display_tz = _offset(match.group(1))
+
+    def get(self, field: str, default=None):
+        if field not in _FIELD_SET:
+            return default
+        value = getattr(self, field)
+        return default if value is None else value
+
+    def __getitem__(self, field: str):
+        if field not in _FIELD_SET:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in RECORD_FIELDS if getattr(self, field) is not None}
+
+    def __repr__(self):
+        return f"UserActivityRecord({self.to_dict()!r})"
+
+
+_FIELD_SET = frozenset(RECORD_FIELDS)
+
+
+def decode_record(value):
+    """
+    Decodes one raw:Raw value (bytes or str) into a UserActivityRecord. Returns None if it is not a json object.
+    """
+    try:
+        values = json.loads(value)
+    except ValueError:
+        return None
+    if not isinstance(values, dict):
+        return None
+    return UserActivityRecord(values)
+
+
+def decode_batch(values):
+    """
+    Decodes a batch of raw:Raw cell values straight from row bytes.
+
+    Returns:
+        list: one entry per value, a UserActivityRecord or None where the value is not a json object.
+    """
+    loads = json.loads
+    records = []
+    for value in values:
+        try:
+            decoded = loads(value)
+        except ValueError:
+            decoded = None
+        records.append(UserActivityRecord(decoded) if isinstance(decoded, dict) else None)
+    return records
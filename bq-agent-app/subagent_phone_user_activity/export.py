@@ -0,0 +1,218 @@
+"""
+Streams patient ranges from Bigtable into partitioned, compressed Parquet files for offline analysis.
+
+Files are laid out as
+    <output_dir>/patient_id=<id>/record_type=<type>/date=<YYYY-MM-DD>/part-00000.parquet
+with exactly one file per UTC day: every day the range touches is exported whole, so overlapping exports never
+put the same rows into two files. Rows are written one row group at a time so memory stays bounded and days
+are exported in parallel. A file is marked complete only if its day had ended (plus a grace period for late
+rows) when it was written; complete days are skipped on the next run, partial ones are written again, so an
+interrupted export can simply be run again.
+
+    python -m subagent_phone_user_activity.export <patient_id> <start_time> <end_time> --out exports/
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from .progress import report_progress
+from .read_executor import read_rows_resilient
+from .decoder import decode_record
+from .records import RECORD_FIELDS
+from .rowkeys import decode_key, split_time_range, time_range
+from .table import get_table, raw_value
+
+EXPORT_WORKERS = 4
+EXPORT_ROW_GROUP_SIZE = 50000
+EXPORT_COMPRESSION = "zstd"
+EXPORT_READ_DEADLINE_SECONDS = 600
+SECONDS_PER_DAY = 86400
+EXPORT_LATE_DATA_SECONDS = 3600
+EXPORT_FILE_NAME = "part-00000.parquet"
+# Root that export_records_parquet (the agent tool) may write below.
+EXPORT_ROOT = os.environ.get("PHONE_LOGS_EXPORT_ROOT", "exports")
+_COMPLETE_KEY = b"export_complete"
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet export requires pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def export_schema():
+    pa = _pyarrow()
+    string_fields = [pa.field(field, pa.string()) for field in RECORD_FIELDS if field != "RecordedSystemTime"]
+    return pa.schema([
+        pa.field("row_key", pa.string()),
+        pa.field("patient_id", pa.string()),
+        pa.field("record_type", pa.string()),
+        pa.field("key_time", pa.int64()),
+        pa.field("RecordedSystemTime", pa.timestamp("us", tz="UTC")),
+    ] + string_fields)
+
+
+def day_ranges(start_time: int, end_time: int):
+    """
+    Returns the whole UTC days touched by [start_time, end_time] (unix seconds, inclusive) as [start, end) ranges.
+    """
+    first_day = start_time // SECONDS_PER_DAY * SECONDS_PER_DAY
+    last_day = end_time // SECONDS_PER_DAY * SECONDS_PER_DAY
+    return [(start, end + 1) for start, end in split_time_range(first_day, last_day + SECONDS_PER_DAY - 1, SECONDS_PER_DAY)]
+
+
+def check_path_part(name: str, value: str):
+    """
+    Rejects ids that cannot be used as a single path component.
+
+    Raises:
+        ValueError: if value is empty or contains a path separator, "#" or "..".
+    """
+    if not value or any(part in value for part in ("/", "\\", "#", "..")):
+        raise ValueError(f"invalid {name} '{value}'")
+
+
+def resolve_export_dir(output_dir: str, root: str = EXPORT_ROOT) -> str:
+    """
+    Resolves an output directory below the export root.
+
+    Raises:
+        ValueError: if the directory would be outside the export root.
+    """
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, output_dir or "."))
+    if path != root and not path.startswith(root + os.sep):
+        raise ValueError(f"output_dir '{output_dir}' is outside the export root {root}")
+    return path
+
+
+def _partition_path(output_dir: str, patient_id: str, recordType: str, start: int) -> str:
+    day = datetime.fromtimestamp(start, tz=timezone.utc).strftime("%Y-%m-%d")
+    return os.path.join(output_dir, f"patient_id={patient_id}", f"record_type={recordType}", f"date={day}", EXPORT_FILE_NAME)
+
+
+def _is_complete(path: str) -> bool:
+    if not os.path.exists(path):
+        return False
+    metadata = _pyarrow().parquet.read_schema(path).metadata or {}
+    return metadata.get(_COMPLETE_KEY) == b"true"
+
+
+def _to_column_value(value):
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+
+
+def _flush(writer, schema, columns):
+    pa = _pyarrow()
+    writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+    for values in columns.values():
+        values.clear()
+
+
+def export_range(table, patient_id: str, recordType: str, start: int, end: int, output_dir: str,
+                 row_group_size: int = EXPORT_ROW_GROUP_SIZE):
+    """
+    Exports the rows of one UTC day [start, end) to the day's Parquet file, one row group at a time.
+    A complete file of the day is kept; a partial one is replaced.
+
+    Returns:
+        dict: path, rows written, whether a complete file already existed and was skipped, and whether
+            the written day was complete.
+    """
+    pa = _pyarrow()
+    path = _partition_path(output_dir, patient_id, recordType, start)
+    if _is_complete(path):
+        return {"path": path, "rows": 0, "skipped": True, "complete": True}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    complete = end + EXPORT_LATE_DATA_SECONDS <= time.time()
+    schema = export_schema().with_metadata({_COMPLETE_KEY: b"true" if complete else b"false"})
+    columns = {name: [] for name in schema.names}
+    tmp_path = path + ".tmp"
+    rows = 0
+    start_key, end_key = time_range(patient_id, recordType, start, end, end_inclusive=False)
+    with pa.parquet.ParquetWriter(tmp_path, schema, compression=EXPORT_COMPRESSION) as writer:
+        for row in read_rows_resilient(table, start_key, end_key, deadline=EXPORT_READ_DEADLINE_SECONDS):
+            row_key = row.row_key.decode("utf-8")
+            record = decode_record(raw_value(row))
+            if record is None:
+                continue
+            columns["row_key"].append(row_key)
+            columns["patient_id"].append(patient_id)
+            columns["record_type"].append(recordType)
+            columns["key_time"].append(decode_key(row_key).timestamp)
+            columns["RecordedSystemTime"].append(None if record.system_ts is None else int(record.system_ts * 1_000_000))
+            for field in RECORD_FIELDS:
+                if field != "RecordedSystemTime":
+                    columns[field].append(_to_column_value(record.get(field)))
+            rows += 1
+            if len(columns["row_key"]) >= row_group_size:
+                _flush(writer, schema, columns)
+        if columns["row_key"]:
+            _flush(writer, schema, columns)
+    os.replace(tmp_path, path)
+    return {"path": path, "rows": rows, "skipped": False, "complete": complete}
+
+
+def export_patient_range(patient_id: str, recordType: str, start_time: int, end_time: int, output_dir: str,
+                         workers: int = EXPORT_WORKERS):
+    """
+    Exports every UTC day touched by [start_time, end_time] (inclusive) for one patient and record type, one file
+    per day, in parallel.
+
+    Returns:
+        dict: totals and the per file results.
+
+    Raises:
+        ValueError: if patient_id or recordType cannot be used in a path.
+    """
+    check_path_part("patient_id", patient_id)
+    check_path_part("recordType", recordType)
+    table = get_table()
+    ranges = day_ranges(start_time, end_time)
+    report_progress("export", f"exporting {len(ranges)} day partitions to {output_dir}", partitions=len(ranges))
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(export_range, table, patient_id, recordType, start, end, output_dir)
+            for start, end in ranges
+        ]
+        for future in futures:
+            result = future.result()
+            results.append(result)
+            report_progress("export", f"{len(results)}/{len(ranges)} partitions done, {result['rows']:,} rows in {result['path']}",
+                            rows=result["rows"])
+    return {
+        "files": len(results),
+        "skipped": sum(1 for r in results if r["skipped"]),
+        "partial_days": sum(1 for r in results if not r["complete"]),
+        "rows": sum(r["rows"] for r in results),
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("patient_id", help="patient UUID")
+    parser.add_argument("start_time", type=int, help="range start in unix seconds")
+    parser.add_argument("end_time", type=int, help="range end in unix seconds (inclusive)")
+    parser.add_argument("--record-type", default="UserActivityRecord", help="record type to export")
+    parser.add_argument("--out", default="exports", help="output directory")
+    parser.add_argument("--workers", type=int, default=EXPORT_WORKERS, help="days exported in parallel")
+    args = parser.parse_args()
+
+    summary = export_patient_range(args.patient_id, args.record_type, args.start_time, args.end_time, args.out, args.workers)
+    print(f"wrote {summary['rows']:,} rows to {summary['files'] - summary['skipped']} files, "
+          f"skipped {summary['skipped']} complete days, {summary['partial_days']} days still partial")
+
+
+if __name__ == "__main__":
+    main()
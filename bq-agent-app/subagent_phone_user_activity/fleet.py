@@ -0,0 +1,195 @@
+import json
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .decoder import decode_record
+from .progress import report_progress
+from .read_executor import read_rows_resilient
+from .records import format_timestamp
+from .rowkeys import decode_key
+from .table import get_table, raw_value
+
+# Row keys start with patient_id, so cross-patient questions ("which patients saw pairing failures on
+# transmitter X last week?") need a full table scan. The table is split into shards at the tablet
+# boundaries reported by sample_row_keys, shards are scanned in parallel with the record type, transmitter,
+# stream and activity type pushed down as Bigtable filters, and per-shard partial aggregates are merged as
+# they complete. A secondary index keyed by transmitter could later replace the scan behind the same tool.
+FLEET_SCAN_WORKERS = 8
+FLEET_SCAN_DEADLINE_SECONDS = 120
+MAX_FLEET_PATIENTS = 100
+
+
+def shard_ranges(table):
+    """
+    Splits the whole table into (start_key, end_key) shards using sample_row_keys.
+    None means the start or end of the table; end keys are exclusive.
+    """
+    boundaries = [sample.row_key for sample in table.sample_row_keys() if sample.row_key]
+    starts = [None] + boundaries
+    ends = boundaries + [None]
+    return list(zip(starts, ends))
+
+
+def _json_field_regex(field: str, value: str) -> bytes:
+    return f'(?s).*"{field}"\\s*:\\s*"?{re.escape(value)}"?[,}}\\s].*'.encode("utf-8")
+
+
+def build_scan_filter(recordType: str, transmitter_number: str = "", stream: str = "", activity_type: str = ""):
+    """
+    Builds the server-side filter for a fleet scan: latest raw:Raw cell of rows of the record type,
+    whose json value contains the requested TransmitterNumber / Stream / UseractivityType.
+    """
+    from google.cloud.bigtable import row_filters
+
+    filters = [
+        row_filters.RowKeyRegexFilter(f"[^#]*#{re.escape(recordType)}#.*".encode("utf-8")),
+        row_filters.ColumnQualifierRegexFilter(b"Raw"),
+        row_filters.CellsColumnLimitFilter(1),
+    ]
+    for field, value in (("TransmitterNumber", transmitter_number), ("Stream", stream), ("UseractivityType", activity_type)):
+        if value:
+            filters.append(row_filters.ValueRegexFilter(_json_field_regex(field, value)))
+    return row_filters.RowFilterChain(filters=filters)
+
+
+def _new_partial():
+    return {"rows_scanned": 0, "matched": 0, "patients": {}, "complete": True, "failed_shards": 0, "skipped_shards": 0}
+
+
+def _scan_shard(table, start_key, end_key, scan_filter, start_time, end_time, subtype_prefix, deadline):
+    """
+    Scans one shard and returns its partial aggregate: per patient count, first/last time and subtype counts.
+    A shard that runs out of time or fails keeps what it read so far and is marked incomplete.
+    """
+    partial = _new_partial()
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        # Shards still queued at the deadline are not read at all rather than sending an RPC and cancelling it.
+        partial["complete"] = False
+        partial["skipped_shards"] += 1
+        return partial
+
+    from google.api_core.exceptions import DeadlineExceeded, GoogleAPICallError
+
+    rows = read_rows_resilient(table, start_key, end_key, filter_=scan_filter, deadline=remaining)
+    try:
+        for row in rows:
+            _add_row(partial, row, start_time, end_time, subtype_prefix)
+    except DeadlineExceeded:
+        partial["complete"] = False
+    except GoogleAPICallError as e:
+        print(f"fleet scan of shard [{start_key!r}, {end_key!r}) failed: {e}")
+        partial["complete"] = False
+        partial["failed_shards"] += 1
+    return partial
+
+
+def _add_row(partial, row, start_time, end_time, subtype_prefix):
+    partial["rows_scanned"] += 1
+    try:
+        key = decode_key(row.row_key)
+    except ValueError:
+        return
+    if key.timestamp is None:
+        return
+    patient_id, ts = key.patient_id, key.timestamp
+    if (start_time and ts < start_time) or (end_time and ts > end_time):
+        return
+    record = decode_record(raw_value(row))
+    if record is None:
+        return
+    subtype = record.get("UseractivitySubType") or ""
+    if subtype_prefix and not subtype.lower().startswith(subtype_prefix.lower()):
+        return
+
+    partial["matched"] += 1
+    patient = partial["patients"].get(patient_id)
+    if patient is None:
+        patient = partial["patients"][patient_id] = {"count": 0, "first": ts, "last": ts, "subtypes": Counter()}
+    patient["count"] += 1
+    patient["first"] = min(patient["first"], ts)
+    patient["last"] = max(patient["last"], ts)
+    patient["subtypes"][subtype] += 1
+
+
+def _merge(total, partial):
+    total["rows_scanned"] += partial["rows_scanned"]
+    total["matched"] += partial["matched"]
+    total["failed_shards"] += partial["failed_shards"]
+    total["skipped_shards"] += partial["skipped_shards"]
+    total["complete"] = total["complete"] and partial["complete"]
+    for patient_id, patient in partial["patients"].items():
+        merged = total["patients"].get(patient_id)
+        if merged is None:
+            total["patients"][patient_id] = patient
+            continue
+        merged["count"] += patient["count"]
+        merged["first"] = min(merged["first"], patient["first"])
+        merged["last"] = max(merged["last"], patient["last"])
+        merged["subtypes"].update(patient["subtypes"])
+
+
+def fleet_scan(recordType: str, start_time: int, end_time: int, transmitter_number: str, stream: str, activity_type: str, subtype_prefix: str):
+    """
+    Scans records of ALL patients to answer cross-patient questions, e.g. "which patients saw pairing failures on transmitter X last week?".
+    Does not require a patient_id. Leave a filter as an empty string to not filter on it. The scan is bounded in time; if it
+    did not finish or some shards failed, "complete" is false and the counts are partial.
+
+    Args:
+        recordType (str): a label for the record type, e.g. UserActivityRecord
+        start_time (int): a timestamp in unix seconds, 0 for no bound
+        end_time (int): a timestamp in unix seconds, 0 for no bound
+        transmitter_number (str): only records with this TransmitterNumber
+        stream (str): only records with this Stream
+        activity_type (str): only records with this UseractivityType
+        subtype_prefix (str): only records whose UseractivitySubType starts with this, e.g. "Pairing Transmitter"
+
+    Returns:
+        string: JSON-formatted per patient counts, first/last seen times and top subtypes.
+    """
+    table = get_table()
+    scan_filter = build_scan_filter(recordType, transmitter_number, stream, activity_type)
+    shards = shard_ranges(table)
+    deadline = time.monotonic() + FLEET_SCAN_DEADLINE_SECONDS
+    report_progress("fleet_scan", f"scanning {len(shards)} shards", shards=len(shards))
+
+    total = _new_partial()
+    done = 0
+    with ThreadPoolExecutor(max_workers=FLEET_SCAN_WORKERS) as pool:
+        futures = [
+            pool.submit(_scan_shard, table, start_key, end_key, scan_filter, start_time, end_time, subtype_prefix, deadline)
+            for start_key, end_key in shards
+        ]
+        for future in as_completed(futures):
+            _merge(total, future.result())
+            done += 1
+            report_progress(
+                "fleet_scan",
+                f"{done}/{len(shards)} shards scanned, {total['matched']:,} matching records from {len(total['patients'])} patients",
+                shards_done=done,
+                matched=total["matched"],
+            )
+
+    patients = sorted(total["patients"].items(), key=lambda item: item[1]["count"], reverse=True)
+    result = {
+        "complete": total["complete"],
+        "shards": len(shards),
+        "failed_shards": total["failed_shards"],
+        "skipped_shards": total["skipped_shards"],
+        "rows_scanned": total["rows_scanned"],
+        "matched": total["matched"],
+        "patient_count": len(patients),
+        "patients": [
+            {
+                "patient_id": patient_id,
+                "count": patient["count"],
+                "first_seen": format_timestamp(patient["first"]),
+                "last_seen": format_timestamp(patient["last"]),
+                "top_subtypes": dict(patient["subtypes"].most_common(5)),
+            }
+            for patient_id, patient in patients[:MAX_FLEET_PATIENTS]
+        ],
+    }
+    return json.dumps(result)
@@ -0,0 +1,249 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .read_executor import read_rows_resilient
+from .rowkeys import time_range
+from .table import get_table, raw_value
+
+# Opt-in speculative read-ahead. Investigations usually move step by step ("now the day before", "and the next
+# morning"), so once a patient/range is loaded the adjacent windows and the other record types of the same
+# window are fetched in the background and kept in a byte-bounded LRU cache that get_records_bigtable checks
+# first. Enable with PHONE_LOGS_PREFETCH=1; get_prefetch_stats() shows whether it pays off.
+#
+# Only settled windows are prefetched, cached and served: a window whose end plus PREFETCH_LATE_DATA_SECONDS is
+# after the time it was fetched can still receive rows (e.g. "today"), so it is always read from Bigtable.
+PREFETCH_ENABLED = os.environ.get("PHONE_LOGS_PREFETCH", "").lower() in ("1", "true", "yes")
+PREFETCH_WORKERS = 2
+PREFETCH_CACHE_BYTES = 64 * 1024 * 1024
+PREFETCH_WINDOW_MAX_BYTES = 16 * 1024 * 1024
+PREFETCH_WAIT_SECONDS = 30
+SECONDS_PER_DAY = 86400
+# Windows within this much of a whole number of days ("midnight to 11:59pm") are treated as whole days.
+DAY_SNAP_SECONDS = 3600
+PREFETCH_LATE_DATA_SECONDS = 3600
+RECORD_TYPES = ["UserActivityRecord", "ErrorLogRecord", "GlucoseRecord", "MeterRecord"]
+
+
+class WindowCache:
+    """
+    LRU cache of fetched windows, keyed by (patient_id, recordType, start_time, end_time), bounded by total bytes.
+    Values are lists of (row_key, raw value bytes), stored with the time they were fetched. A request is served by
+    any cached window that contains it, and windows still being prefetched are waited for instead of read twice.
+    """
+
+    def __init__(self, max_bytes: int = PREFETCH_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._windows = OrderedDict()
+        self._sizes = {}
+        self._fetched_at = {}
+        self._in_flight = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "prefetched": 0, "evicted": 0, "skipped_over_budget": 0, "skipped_unsettled": 0}
+
+    def get(self, key):
+        with self._lock:
+            cached = _containing(self._windows, key)
+            if cached is not None and is_settled(cached, self._fetched_at[cached]):
+                self._windows.move_to_end(cached)
+                self.stats["hits"] += 1
+                return _rows_within(self._windows[cached], cached, key)
+            in_flight = _containing(self._in_flight, key)
+            future = self._in_flight[in_flight] if in_flight is not None else None
+        if future is not None:
+            try:
+                rows = future.result(timeout=PREFETCH_WAIT_SECONDS)
+            except Exception:
+                rows = None
+            if rows is not None:
+                with self._lock:
+                    self.stats["hits"] += 1
+                return _rows_within(rows, in_flight, key)
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, key, rows, fetched_at: float):
+        """
+        Caches a window read at fetched_at (unix seconds, taken before the read started). Returns whether it was
+        cached; windows that were not settled at fetched_at or exceed the byte budget are not.
+        """
+        size = sum(len(row_key) + len(value) for row_key, value in rows)
+        with self._lock:
+            if not is_settled(key, fetched_at):
+                self.stats["skipped_unsettled"] += 1
+                return False
+            if size > self.max_bytes:
+                self.stats["skipped_over_budget"] += 1
+                return False
+            if key in self._windows:
+                self._bytes -= self._sizes.pop(key)
+                del self._windows[key]
+            self._windows[key] = rows
+            self._sizes[key] = size
+            self._fetched_at[key] = fetched_at
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                evicted, _ = self._windows.popitem(last=False)
+                self._bytes -= self._sizes.pop(evicted)
+                del self._fetched_at[evicted]
+                self.stats["evicted"] += 1
+            return True
+
+    def count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def track(self, key, submit):
+        """
+        Starts a background fetch with submit() unless the window is cached or already in flight. Returns whether it started.
+        """
+        with self._lock:
+            if key in self._windows or key in self._in_flight:
+                return False
+            self._in_flight[key] = submit()
+            return True
+
+    def untrack(self, key):
+        with self._lock:
+            self._in_flight.pop(key, None)
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["windows"] = len(self._windows)
+            stats["bytes"] = self._bytes
+            stats["in_flight"] = len(self._in_flight)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else None
+        return stats
+
+
+def is_settled(key, fetched_at: float) -> bool:
+    """
+    Whether a (patient_id, recordType, start_time, end_time) window read at fetched_at can no longer receive rows.
+    """
+    return key[3] + PREFETCH_LATE_DATA_SECONDS <= fetched_at
+
+
+def _containing(windows, key):
+    """
+    Returns the key of a window in windows that covers key: key itself, or a window of the same patient and
+    record type whose time range contains it. None if there is none.
+    """
+    if key in windows:
+        return key
+    patient_id, recordType, start_time, end_time = key
+    for other in windows:
+        if other[0] == patient_id and other[1] == recordType and other[2] <= start_time and end_time <= other[3]:
+            return other
+    return None
+
+
+def _rows_within(rows, window, key):
+    if window == key:
+        return rows
+    start_key, end_key = time_range(*key)
+    return [(row_key, value) for row_key, value in rows if start_key <= row_key < end_key]
+
+
+def fetch_window(table, key, max_bytes: int = None):
+    """
+    Reads one window as a list of (row_key, raw value bytes). Returns None if it grows beyond max_bytes.
+    """
+    start_key, end_key = time_range(*key)
+    rows, size = [], 0
+    for row in read_rows_resilient(table, start_key, end_key):
+        row_key, value = row.row_key.decode("utf-8"), raw_value(row)
+        size += len(row_key) + len(value)
+        if max_bytes is not None and size > max_bytes:
+            return None
+        rows.append((row_key, value))
+    return rows
+
+
+class Prefetcher:
+    """
+    Fetches the windows around a loaded range in the background under a concurrency and byte budget.
+    """
+
+    def __init__(self, cache: WindowCache, workers: int = PREFETCH_WORKERS, window_max_bytes: int = PREFETCH_WINDOW_MAX_BYTES):
+        self.cache = cache
+        self.window_max_bytes = window_max_bytes
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+
+    @staticmethod
+    def candidates(patient_id: str, recordType: str, start_time: int, end_time: int):
+        """
+        The windows a follow-up question is likely to ask for: the previous and next window of the same length
+        and the other record types. Windows of about whole days (00:00-23:59 or 00:00-23:59:59) prefetch the
+        whole previous / next days, which contain the next request whichever end second it uses.
+        """
+        length = end_time - start_time
+        days = round(length / SECONDS_PER_DAY)
+        if days >= 1 and abs(length - days * SECONDS_PER_DAY) <= DAY_SNAP_SECONDS:
+            shift = days * SECONDS_PER_DAY
+            windows = [
+                (patient_id, recordType, start_time - shift, start_time - 1),
+                (patient_id, recordType, start_time + shift, start_time + 2 * shift - 1),
+            ]
+        else:
+            shift = max(60, round(length / 60) * 60)
+            windows = [
+                (patient_id, recordType, start_time - shift, end_time - shift),
+                (patient_id, recordType, start_time + shift, end_time + shift),
+            ]
+        windows += [(patient_id, other, start_time, end_time) for other in RECORD_TYPES if other != recordType]
+        return windows
+
+    def schedule_around(self, patient_id: str, recordType: str, start_time: int, end_time: int):
+        """
+        Queues background fetches for the settled candidate windows that are not cached or in flight yet.
+        """
+        scheduled = 0
+        now = time.time()
+        for key in self.candidates(patient_id, recordType, start_time, end_time):
+            if not is_settled(key, now):
+                self.cache.count("skipped_unsettled")
+                continue
+            if self.cache.track(key, lambda: self._pool.submit(self._fetch, key)):
+                scheduled += 1
+        return scheduled
+
+    def _fetch(self, key):
+        try:
+            fetched_at = time.time()
+            rows = fetch_window(get_table(), key, self.window_max_bytes)
+            if rows is None:
+                self.cache.count("skipped_over_budget")
+                return None
+            if not self.cache.put(key, rows, fetched_at):
+                return None
+            self.cache.count("prefetched")
+            return rows
+        except Exception as e:
+            print(f"prefetch of {key} failed: {e}")
+            return None
+        finally:
+            self.cache.untrack(key)
+
+
+window_cache = WindowCache()
+_prefetcher = None
+
+
+def get_prefetcher() -> Prefetcher:
+    global _prefetcher
+    if _prefetcher is None:
+        _prefetcher = Prefetcher(window_cache)
+    return _prefetcher
+
+
+def get_prefetch_stats():
+    """
+    Returns cache hit/miss counts, hit rate, prefetched and evicted windows and the bytes held.
+    """
+    return window_cache.snapshot()
@@ -0,0 +1,45 @@
+import time
+from contextvars import ContextVar
+
+# Listeners registered by whoever is driving the agent (e.g. stream_agent_async).
+# Tools call report_progress() while they work and every listener gets the event
+# immediately, so the caller can show "fetched 12,400 rows" before the model replies.
+# Listeners live in a context variable, so with several sessions served by one process
+# (adk web) each run only receives the events of the tools it started itself.
+_listeners = ContextVar("progress_listeners", default=())
+
+
+def add_progress_listener(listener):
+    """
+    Registers a callable that receives progress events as dicts, for the current context (run) only.
+
+    Args:
+        listener (callable): called with a dict like {"type": "progress", "stage": ..., "message": ...}
+    """
+    _listeners.set(_listeners.get() + (listener,))
+
+
+def remove_progress_listener(listener):
+    """
+    Unregisters a listener added with add_progress_listener. Unknown listeners are ignored.
+    """
+    _listeners.set(tuple(registered for registered in _listeners.get() if registered is not listener))
+
+
+def report_progress(stage: str, message: str, **fields):
+    """
+    Publishes a structured progress event from inside a tool.
+
+    Args:
+        stage (str): short machine-readable step name, e.g. "fetch" or "aggregate"
+        message (str): human-readable description, e.g. "fetched 12,400 rows"
+        **fields: extra values to attach to the event (row counts, keys, ...)
+    """
+    event = {"type": "progress", "stage": stage, "message": message, "time": time.time()}
+    event.update(fields)
+    for listener in _listeners.get():
+        try:
+            listener(event)
+        except Exception as e:
+            # A broken listener must never fail the tool call itself.
+            print(f"progress listener error: {e}")
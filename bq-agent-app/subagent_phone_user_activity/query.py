@@ -0,0 +1,222 @@
+import json
+import re
+from collections import Counter
+from fnmatch import fnmatchcase
+
+from .records import format_timestamp, parse_timestamp, record_dict, record_time, resolve_field
+
+# A query is a comma separated list of clauses, for example:
+#
+#   filter type=Networking, subtype~"Pairing Transmitter*", bucket=5m, count, top 10
+#
+# Supported clauses:
+#   filter/where <cond> [and <cond> ...]   or a bare <cond>
+#       <cond> is <field><op><value> with op one of = != ~ !~ (glob) > >= < <= (time or numbers)
+#   by <field> [<field> ...]  /  group by ...  group the result (implies count)
+#   bucket=<n><s|m|h|d>                     group by time bucket of RecordedSystemTime (implies count)
+#   count                                   return counts instead of records
+#   top <n>                                 largest groups first, keep n (implies count)
+#   fields <field> [<field> ...]            columns to return for record results
+#   limit <n>                               maximum number of result rows
+MAX_RESULT_ROWS = 200
+
+_COND_RE = re.compile(r"^\s*([A-Za-z_]+)\s*(!=|!~|>=|<=|=|~|>|<)\s*(.+?)\s*$")
+_BUCKET_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+_TIME_FIELDS = {"RecordedSystemTime", "RecordedDisplayTime"}
+_CLAUSE_SEPARATOR = re.compile(",")
+_AND_SEPARATOR = re.compile(r"\s+and\s+", re.IGNORECASE)
+
+
+def _split_unquoted(text: str, separator):
+    """
+    Splits text on a separator regex, ignoring separators inside single or double quoted values.
+    """
+    quoted, quote = [], None
+    for ch in text:
+        if quote:
+            quoted.append(True)
+            if ch == quote:
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+            quoted.append(True)
+        else:
+            quoted.append(False)
+    if quote:
+        raise ValueError("unterminated quote in query")
+    parts, start = [], 0
+    for match in separator.finditer(text):
+        if not any(quoted[match.start():match.end()]):
+            parts.append(text[start:match.start()].strip())
+            start = match.end()
+    parts.append(text[start:].strip())
+    return [part for part in parts if part]
+
+
+def _split_clauses(query: str):
+    return _split_unquoted(query, _CLAUSE_SEPARATOR)
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+
+def _parse_bucket(value: str) -> int:
+    match = re.fullmatch(r"\s*(\d+)\s*([smhd]?)\s*", value.lower())
+    if not match or int(match.group(1)) <= 0:
+        raise ValueError(f"invalid bucket '{value}', expected e.g. 30s, 5m, 1h or 1d")
+    return int(match.group(1)) * _BUCKET_UNITS[match.group(2) or "s"]
+
+
+def _compile_condition(text: str):
+    match = _COND_RE.match(text)
+    if not match:
+        raise ValueError(f"invalid condition '{text}', expected <field><op><value>")
+    field = resolve_field(match.group(1))
+    op = match.group(2)
+    value = _unquote(match.group(3))
+
+    if op in ("=", "!="):
+        expected = value.lower()
+        test = lambda actual: str(actual).lower() == expected
+    elif op in ("~", "!~"):
+        pattern = value.lower()
+        test = lambda actual: fnmatchcase(str(actual).lower(), pattern)
+    else:
+        if field in _TIME_FIELDS:
+            bound = parse_timestamp(value)
+            convert = parse_timestamp
+        else:
+            bound, convert = float(value), float
+        if bound is None:
+            raise ValueError(f"invalid time '{value}' in condition '{text}'")
+        compare = {
+            ">": lambda a: a > bound,
+            ">=": lambda a: a >= bound,
+            "<": lambda a: a < bound,
+            "<=": lambda a: a <= bound,
+        }[op]
+
+        def test(actual):
+            try:
+                converted = convert(actual)
+            except (TypeError, ValueError):
+                return False
+            return converted is not None and compare(converted)
+
+    negate = op.startswith("!")
+
+    def predicate(record):
+        actual = record.get(field)
+        if actual is None:
+            return negate
+        return test(actual) != negate
+
+    return predicate
+
+
+def parse_query(query: str):
+    """
+    Parses a query string into a plan dict. See the module comment for the grammar.
+
+    Raises:
+        ValueError: if the query is malformed.
+    """
+    plan = {"filters": [], "group_by": [], "bucket": None, "count": False, "top": None, "fields": None, "limit": MAX_RESULT_ROWS}
+    for clause in _split_clauses(query):
+        word, _, rest = clause.partition(" ")
+        word = word.lower()
+        if word in ("filter", "where"):
+            for cond in _split_unquoted(rest, _AND_SEPARATOR):
+                plan["filters"].append(_compile_condition(cond))
+        elif word == "count" and not rest.strip():
+            plan["count"] = True
+        elif word == "top":
+            plan["top"] = int(rest)
+            plan["count"] = True
+        elif word == "limit":
+            plan["limit"] = min(int(rest), MAX_RESULT_ROWS)
+        elif word in ("by", "group"):
+            names = rest.strip()
+            if word == "group":
+                names = re.sub(r"^by\s+", "", names, flags=re.IGNORECASE)
+            plan["group_by"].extend(resolve_field(name) for name in names.split())
+            plan["count"] = True
+        elif word in ("fields", "select"):
+            plan["fields"] = [resolve_field(name) for name in rest.split()]
+        elif clause.lower().startswith("bucket"):
+            plan["bucket"] = _parse_bucket(clause.split("=", 1)[-1] if "=" in clause else rest)
+            plan["count"] = True
+        else:
+            plan["filters"].append(_compile_condition(clause))
+    if plan["top"] is not None and plan["top"] <= 0:
+        raise ValueError("top must be a positive number")
+    if plan["limit"] <= 0:
+        raise ValueError("limit must be a positive number")
+    return plan
+
+
+def _group_value(value):
+    # Data may be a json object; group on its canonical json text since dicts and lists are not hashable.
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True)
+    return value
+
+
+def run_query(records, query: str):
+    """
+    Runs a query over decoded records in a single pass and returns only the result rows.
+
+    Args:
+        records (list): decoded user activity records (UserActivityRecord or dicts)
+        query (str): query string, see the module comment for the grammar
+
+    Returns:
+        dict: {"matched": int, "total": int, "rows": list} plus "groups" when counting.
+    """
+    plan = parse_query(query)
+    filters = plan["filters"]
+    matched = [record for record in records if all(f(record) for f in filters)]
+    result = {"query": query, "total": len(records), "matched": len(matched)}
+
+    if not plan["count"]:
+        fields = plan["fields"]
+        rows = matched[:plan["limit"]]
+        if fields:
+            rows = [{field: record.get(field) for field in fields} for record in rows]
+        else:
+            rows = [record_dict(record) for record in rows]
+        result["rows"] = rows
+        result["truncated"] = len(matched) > len(rows)
+        return result
+
+    bucket = plan["bucket"]
+    group_by = plan["group_by"]
+    counts = Counter()
+    for record in matched:
+        key = tuple(_group_value(record.get(field)) for field in group_by)
+        if bucket:
+            ts = record_time(record)
+            key = (None if ts is None else int(ts // bucket * bucket),) + key
+        counts[key] += 1
+
+    if plan["top"] is not None:
+        groups = counts.most_common(plan["top"])
+    else:
+        groups = sorted(counts.items(), key=lambda item: tuple((k is None, k) for k in item[0]))
+    groups = groups[:plan["limit"]]
+
+    rows = []
+    for key, count in groups:
+        row = {}
+        if bucket:
+            row["bucket_start"] = format_timestamp(key[0])
+            key = key[1:]
+        row.update(zip(group_by, key))
+        row["count"] = count
+        rows.append(row)
+    result["groups"] = len(counts)
+    result["rows"] = rows
+    return result
@@ -0,0 +1,222 @@
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+# Every Bigtable range read goes through read_rows_resilient:
+#   - a per-request deadline bounds the whole read,
+#   - if the first row has not arrived after the recent p95 time-to-first-row, one hedged duplicate
+#     request is sent and whichever attempt answers first wins (the other is cancelled),
+#   - a failed or stalled stream is retried with full-jitter backoff, resuming after the last row key
+#     already received so no row is returned twice,
+#   - hedges are capped to a fraction of requests so a slow cluster does not get double the load,
+#   - rows are handed over through a bounded queue, so a slow consumer (e.g. a Parquet export) pauses the
+#     stream instead of the reader buffering the whole range in memory.
+READ_DEADLINE_SECONDS = 60
+READ_IDLE_TIMEOUT_SECONDS = 20
+MAX_READ_RETRIES = 4
+RETRY_BACKOFF_BASE_SECONDS = 0.2
+RETRY_BACKOFF_MAX_SECONDS = 5.0
+DEFAULT_HEDGE_DELAY_SECONDS = 1.0
+MIN_HEDGE_DELAY_SECONDS = 0.05
+MIN_SAMPLES_FOR_P95 = 20
+MAX_HEDGE_RATIO = 0.1
+READ_QUEUE_ROWS = 1000
+_PUT_POLL_SECONDS = 0.1
+
+RETRIABLE_ERRORS = ("DeadlineExceeded", "ServiceUnavailable", "Aborted", "InternalServerError")
+
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "attempts": 0, "hedges": 0, "hedge_wins": 0, "retries": 0, "timeouts": 0, "errors": 0}
+_first_row_latencies = deque(maxlen=512)
+
+
+def _count(name: str, n: int = 1):
+    with _stats_lock:
+        _stats[name] += n
+
+
+def get_read_stats():
+    """
+    Returns a snapshot of the read counters (requests, attempts, hedges, hedge_wins, retries, timeouts, errors)
+    and the current hedge delay.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["hedge_delay_seconds"] = hedge_delay()
+    return stats
+
+
+def hedge_delay() -> float:
+    """
+    Delay before sending a hedged request: the p95 of recent time-to-first-row latencies.
+    """
+    with _stats_lock:
+        samples = sorted(_first_row_latencies)
+    if len(samples) < MIN_SAMPLES_FOR_P95:
+        return DEFAULT_HEDGE_DELAY_SECONDS
+    return max(MIN_HEDGE_DELAY_SECONDS, samples[int(0.95 * (len(samples) - 1))])
+
+
+def _backoff(retry: int) -> float:
+    return random.uniform(0, min(RETRY_BACKOFF_MAX_SECONDS, RETRY_BACKOFF_BASE_SECONDS * 2 ** retry))
+
+
+class _Attempt:
+    """
+    One streaming read_rows call running in a background thread, pushing (attempt, kind, value) onto a shared queue.
+    """
+
+    def __init__(self, table, row_set, filter_, out):
+        self.started = time.monotonic()
+        self.cancelled = False
+        self._rows = None
+        self._thread = threading.Thread(target=self._run, args=(table, row_set, filter_, out), daemon=True)
+        self._thread.start()
+
+    def _put(self, out, kind, value):
+        # Blocks while the queue is full, but gives up as soon as the attempt is cancelled.
+        while not self.cancelled:
+            try:
+                out.put((self, kind, value), timeout=_PUT_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self, table, row_set, filter_, out):
+        try:
+            self._rows = table.read_rows(row_set=row_set, filter_=filter_)
+            for row in self._rows:
+                if not self._put(out, "row", row):
+                    return
+            self._put(out, "done", None)
+        except Exception as e:
+            if not self.cancelled:
+                self._put(out, "error", e)
+
+    def cancel(self):
+        self.cancelled = True
+        if self._rows is not None:
+            try:
+                self._rows.cancel()
+            except Exception:
+                pass
+
+
+def _row_set(start_key, end_key, start_inclusive: bool, end_inclusive: bool):
+    from google.cloud.bigtable.row_set import RowRange, RowSet
+
+    row_set = RowSet()
+    row_set.add_row_range(RowRange(start_key=start_key, end_key=end_key, start_inclusive=start_inclusive, end_inclusive=end_inclusive))
+    return row_set
+
+
+def read_rows_resilient(table, start_key=None, end_key=None, end_inclusive: bool = False, filter_=None,
+                        deadline: float = READ_DEADLINE_SECONDS, start_inclusive: bool = True):
+    """
+    Yields the rows of one key range, with a deadline, hedging and resumable retries.
+
+    Args:
+        table: a google.cloud.bigtable Table
+        start_key (str|bytes): start key, None for the start of the table
+        end_key (str|bytes): end key, None for the end of the table
+        end_inclusive (bool): whether end_key itself is included
+        filter_: optional RowFilter pushed down to Bigtable
+        deadline (float): seconds for the whole read
+        start_inclusive (bool): whether start_key itself is included
+
+    Raises:
+        google.api_core.exceptions.DeadlineExceeded: if the read does not finish within the deadline.
+        google.api_core.exceptions.GoogleAPICallError: if a non-retriable error occurs or retries are exhausted.
+    """
+    from google.api_core import exceptions
+
+    retriable = tuple(getattr(exceptions, name) for name in RETRIABLE_ERRORS)
+    _count("requests")
+    expires = time.monotonic() + deadline
+    out = queue.Queue(maxsize=READ_QUEUE_ROWS)
+    resume_key, resume_inclusive = start_key, start_inclusive
+    retries = 0
+
+    def start():
+        _count("attempts")
+        return _Attempt(table, _row_set(resume_key, end_key, resume_inclusive, end_inclusive), filter_, out)
+
+    pending = [start()]
+    winner = None
+    hedged = False
+    last_progress = time.monotonic()
+    try:
+        while True:
+            now = time.monotonic()
+            if now >= expires:
+                _count("timeouts")
+                raise exceptions.DeadlineExceeded(f"read of [{start_key!r}, {end_key!r}] exceeded {deadline}s deadline")
+
+            wait = min(expires, last_progress + READ_IDLE_TIMEOUT_SECONDS) - now
+            delay = None
+            if winner is None and not hedged:
+                with _stats_lock:
+                    hedge_allowed = _stats["hedges"] < MAX_HEDGE_RATIO * _stats["requests"]
+                if hedge_allowed:
+                    delay = hedge_delay()
+                    wait = min(wait, pending[0].started + delay - now)
+
+            try:
+                attempt, kind, value = out.get(timeout=max(wait, 0))
+            except queue.Empty:
+                now = time.monotonic()
+                if delay is not None and winner is None and not hedged and now >= pending[0].started + delay:
+                    _count("hedges")
+                    hedged = True
+                    pending.append(start())
+                    continue
+                if now < last_progress + READ_IDLE_TIMEOUT_SECONDS:
+                    continue
+                # Stalled stream: treat like a retriable error and resume after the last key.
+                kind, value = "error", exceptions.DeadlineExceeded("read stalled")
+                attempt = winner or pending[0]
+
+            if attempt.cancelled or (winner is not None and attempt is not winner):
+                continue
+
+            if kind == "row":
+                if winner is None:
+                    winner = attempt
+                    with _stats_lock:
+                        _first_row_latencies.append(time.monotonic() - attempt.started)
+                    if attempt is not pending[0]:
+                        _count("hedge_wins")
+                    for other in pending:
+                        if other is not attempt:
+                            other.cancel()
+                    pending = [attempt]
+                last_progress = time.monotonic()
+                resume_key, resume_inclusive = value.row_key, False
+                yield value
+            elif kind == "done":
+                if winner is None:
+                    with _stats_lock:
+                        _first_row_latencies.append(time.monotonic() - attempt.started)
+                return
+            else:
+                attempt.cancel()
+                pending = [a for a in pending if a is not attempt]
+                if pending and winner is None:
+                    # The other attempt of a hedged pair is still running, let it answer.
+                    continue
+                if not isinstance(value, retriable) or retries >= MAX_READ_RETRIES:
+                    _count("errors")
+                    raise value
+                retries += 1
+                _count("retries")
+                time.sleep(min(_backoff(retries), max(expires - time.monotonic(), 0)))
+                pending = [start()]
+                winner = None
+                hedged = False
+                last_progress = time.monotonic()
+    finally:
+        for attempt in pending:
+            attempt.cancel()
@@ -0,0 +1,93 @@
+import re
+from datetime import datetime, timezone
+
+# Short names accepted by the query/search tools for the keys of a user activity record.
+FIELD_ALIASES = {
+    "stream": "Stream",
+    "systemtime": "RecordedSystemTime",
+    "time": "RecordedSystemTime",
+    "displaytime": "RecordedDisplayTime",
+    "type": "UseractivityType",
+    "subtype": "UseractivitySubType",
+    "data": "Data",
+    "transmitter": "TransmitterNumber",
+    "recordtype": "RecordType",
+}
+RECORD_FIELDS = [
+    "Stream",
+    "RecordedSystemTime",
+    "RecordedDisplayTime",
+    "UseractivityType",
+    "UseractivitySubType",
+    "Data",
+    "TransmitterNumber",
+    "RecordType",
+]
+_FIELDS_BY_LOWER = {field.lower(): field for field in RECORD_FIELDS}
+
+# .NET style timestamps carry 7 fractional digits, datetime only takes 6.
+_FRACTION_RE = re.compile(r"(\.\d{6})\d+")
+
+
+def resolve_field(name: str) -> str:
+    """
+    Maps a short or case-insensitive field name to the record key, e.g. "subtype" -> "UseractivitySubType".
+
+    Raises:
+        ValueError: if the name is not a known record field.
+    """
+    key = name.strip().lower()
+    if key in FIELD_ALIASES:
+        return FIELD_ALIASES[key]
+    if key in _FIELDS_BY_LOWER:
+        return _FIELDS_BY_LOWER[key]
+    raise ValueError(f"unknown field '{name}', expected one of {sorted(FIELD_ALIASES)}")
+
+
+def parse_timestamp(value):
+    """
+    Converts a record time (ISO-8601 string with or without offset, or unix seconds) to unix seconds.
+    Naive datetimes are treated as UTC. Returns None if the value cannot be parsed.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    if text.lstrip("-").replace(".", "", 1).isdigit():
+        return float(text)
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    text = _FRACTION_RE.sub(r"\1", text)
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def record_time(record):
+    """
+    Returns the unix seconds of a record, based on RecordedSystemTime. Decoded UserActivityRecords carry it pre-parsed.
+    """
+    if not isinstance(record, dict):
+        return record.system_ts
+    return parse_timestamp(record.get("RecordedSystemTime"))
+
+
+def record_dict(record):
+    """
+    Returns a json-serializable dict for a decoded record or a plain dict record.
+    """
+    return record if isinstance(record, dict) else record.to_dict()
+
+
+def format_timestamp(seconds):
+    """
+    Formats unix seconds as an ISO-8601 UTC string for tool output.
+    """
+    if seconds is None:
+        return None
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).isoformat()
@@ -0,0 +1,152 @@
+from collections import namedtuple
+
+# Row keys of the phone_user_activity table are "{patient_id}#{recordType}#{unix seconds}", optionally followed by
+# more "#"-separated parts. All read paths build keys and ranges here instead of with ad hoc f-strings.
+#
+# Ranges are half-open [start_key, end_key). A time range that includes end_time ends at the key of end_time + 1,
+# which also covers keys with a suffix after the last second ("...#1746141133#2").
+#
+# A reversed-timestamp layout ("{patient_id}#{recordType}#{REVERSED_TS_BASE - ts}", zero padded) stores the most
+# recent records first; pass reversed_ts=True to read a table written that way.
+KEY_SEPARATOR = "#"
+TIMESTAMP_DIGITS = 10
+REVERSED_TS_BASE = 10 ** TIMESTAMP_DIGITS - 1
+
+RowKey = namedtuple("RowKey", ["patient_id", "record_type", "timestamp", "suffix"])
+KeyRange = namedtuple("KeyRange", ["start_key", "end_key"])
+
+
+def _ts_part(timestamp: int, reversed_ts: bool) -> str:
+    timestamp = int(timestamp)
+    if reversed_ts:
+        if not 0 <= timestamp <= REVERSED_TS_BASE:
+            raise ValueError(f"timestamp {timestamp} out of range for the reversed layout")
+        return str(REVERSED_TS_BASE - timestamp).zfill(TIMESTAMP_DIGITS)
+    return str(timestamp)
+
+
+def key_prefix(patient_id: str, record_type: str) -> str:
+    """
+    Returns "{patient_id}#{record_type}#", the prefix shared by all rows of a patient and record type.
+    """
+    if KEY_SEPARATOR in patient_id or KEY_SEPARATOR in record_type:
+        raise ValueError(f"patient_id and record_type must not contain '{KEY_SEPARATOR}'")
+    return f"{patient_id}{KEY_SEPARATOR}{record_type}{KEY_SEPARATOR}"
+
+
+def encode_key(patient_id: str, record_type: str, timestamp: int, reversed_ts: bool = False) -> str:
+    """
+    Encodes a row key, e.g. encode_key(p, "UserActivityRecord", 1746141133) -> "p#UserActivityRecord#1746141133".
+    """
+    return key_prefix(patient_id, record_type) + _ts_part(timestamp, reversed_ts)
+
+
+def decode_key(key, reversed_ts: bool = False):
+    """
+    Decodes a row key (str or bytes) into RowKey(patient_id, record_type, timestamp, suffix).
+    timestamp is None when the third part is not a number; suffix is whatever follows it, or "".
+
+    Raises:
+        ValueError: if the key has fewer than three parts.
+    """
+    if isinstance(key, bytes):
+        key = key.decode("utf-8")
+    parts = key.split(KEY_SEPARATOR, 3)
+    if len(parts) < 3:
+        raise ValueError(f"not a '{{patient_id}}#{{recordType}}#{{ts}}' row key: {key!r}")
+    timestamp = int(parts[2]) if parts[2].isdigit() else None
+    if timestamp is not None and reversed_ts:
+        timestamp = REVERSED_TS_BASE - timestamp
+    return RowKey(parts[0], parts[1], timestamp, parts[3] if len(parts) > 3 else "")
+
+
+def prefix_end(prefix: str) -> str:
+    """
+    Returns the smallest key greater than every key starting with prefix.
+    """
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def prefix_range(patient_id: str, record_type: str) -> KeyRange:
+    """
+    The range of all rows of a patient and record type.
+    """
+    prefix = key_prefix(patient_id, record_type)
+    return KeyRange(prefix, prefix_end(prefix))
+
+
+def time_range(patient_id: str, record_type: str, start_time: int, end_time: int, end_inclusive: bool = True,
+               reversed_ts: bool = False) -> KeyRange:
+    """
+    Returns the half-open key range of a patient / record type between two unix seconds.
+
+    Args:
+        end_inclusive (bool): include every row of the end_time second (default). With False the range stops
+            before end_time, e.g. for back-to-back buckets.
+        reversed_ts (bool): build the range for the reversed-timestamp layout (most recent first).
+    """
+    last = int(end_time) if end_inclusive else int(end_time) - 1
+    if last < int(start_time):
+        raise ValueError(f"empty time range [{start_time}, {end_time}{']' if end_inclusive else ')'}")
+    if reversed_ts:
+        start_key = encode_key(patient_id, record_type, last, reversed_ts=True)
+        return KeyRange(start_key, _after_second(patient_id, record_type, start_time, reversed_ts=True))
+    start_key = encode_key(patient_id, record_type, start_time)
+    return KeyRange(start_key, _after_second(patient_id, record_type, last, reversed_ts=False))
+
+
+def _after_second(patient_id: str, record_type: str, timestamp: int, reversed_ts: bool) -> str:
+    # The key of the next second sorts after every key of this one, including suffixed ones ("...#ts#n"), since
+    # "#" sorts before the digits. Using it keeps ranges of back-to-back buckets touching, so they merge.
+    timestamp = int(timestamp)
+    if not reversed_ts:
+        return encode_key(patient_id, record_type, timestamp + 1)
+    if timestamp == 0:
+        return prefix_range(patient_id, record_type).end_key
+    return encode_key(patient_id, record_type, timestamp - 1, reversed_ts=True)
+
+
+def split_time_range(start_time: int, end_time: int, bucket_seconds: int):
+    """
+    Splits the inclusive [start_time, end_time] into inclusive (start, end) buckets aligned to multiples of
+    bucket_seconds, e.g. UTC days for bucket_seconds=86400, for reading or exporting in parallel.
+    """
+    if bucket_seconds <= 0:
+        raise ValueError("bucket_seconds must be positive")
+    buckets = []
+    start = int(start_time)
+    while start <= end_time:
+        end = min((start // bucket_seconds + 1) * bucket_seconds - 1, int(end_time))
+        buckets.append((start, end))
+        start = end + 1
+    return buckets
+
+
+def merge_ranges(ranges):
+    """
+    Sorts key ranges and merges overlapping or touching ones into the minimal list of disjoint ranges.
+    None as start_key / end_key means unbounded.
+    """
+    ordered = sorted(ranges, key=lambda r: "" if r.start_key is None else r.start_key)
+    merged = []
+    for start_key, end_key in ordered:
+        if merged:
+            last_start, last_end = merged[-1]
+            if last_end is None or (start_key is not None and start_key <= last_end):
+                if last_end is not None and (end_key is None or end_key > last_end):
+                    merged[-1] = KeyRange(last_start, end_key)
+                continue
+        merged.append(KeyRange(start_key, end_key))
+    return merged
+
+
+def to_row_set(ranges):
+    """
+    Builds a Bigtable RowSet holding the merged ranges.
+    """
+    from google.cloud.bigtable.row_set import RowSet
+
+    row_set = RowSet()
+    for start_key, end_key in merge_ranges(ranges):
+        row_set.add_row_range_from_keys(start_key=start_key, end_key=end_key)
+    return row_set
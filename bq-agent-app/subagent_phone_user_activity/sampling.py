@@ -0,0 +1,154 @@
+from collections import Counter, defaultdict
+
+from .records import format_timestamp, record_dict, record_time
+from .spikes import BURST_BUCKET_SECONDS, describe_burst, detect_bursts, stratum_of
+
+# Bounded view of an oversized result set for the model, never larger than max_records:
+#   - rare subtypes are kept whole (sampled only if they alone exceed the budget),
+#   - every burst bucket is represented by an evenly spaced sample of its records,
+#   - dense subtypes are sampled evenly per time bucket with the remaining budget,
+#   - exact per-stratum and per-burst-bucket counts are attached so totals and magnitudes stay correct.
+MAX_SAMPLED_RECORDS = 2000
+RARE_STRATUM_SIZE = 20
+SAMPLE_BUCKET_SECONDS = 300
+BURST_RECORDS_PER_BUCKET = 50
+# Share of the budget left after rare strata that bursts may use while dense strata still need samples.
+BURST_BUDGET_SHARE = 0.5
+
+
+def _evenly_spaced(ids, k):
+    if k >= len(ids):
+        return list(ids)
+    if k <= 0:
+        return []
+    step = len(ids) / k
+    return [ids[int(i * step)] for i in range(k)]
+
+
+def _allocate(sizes, budget):
+    """
+    Splits budget over groups proportionally to their sizes. Cumulative rounding makes the quotas sum to
+    exactly min(budget, sum(sizes)) and keeps every quota within its group size.
+    """
+    total = sum(sizes)
+    budget = min(budget, total)
+    quotas, seen, taken = [], 0, 0
+    for size in sizes:
+        seen += size
+        target = round(budget * seen / total) if total else 0
+        quotas.append(min(target - taken, size))
+        taken += quotas[-1]
+    return quotas
+
+
+def _sample_groups(groups, budget):
+    """
+    Takes an evenly spaced sample from each list of ids, at most budget ids in total.
+    """
+    picked = []
+    for ids, quota in zip(groups, _allocate([len(ids) for ids in groups], budget)):
+        picked.extend(_evenly_spaced(ids, quota))
+    return picked
+
+
+def stratified_sample(records, max_records: int = MAX_SAMPLED_RECORDS, rare_size: int = RARE_STRATUM_SIZE,
+                      bucket_seconds: int = SAMPLE_BUCKET_SECONDS):
+    """
+    Downsamples decoded records into a spike-preserving, stratified sample of at most max_records records.
+
+    Args:
+        records (list): decoded user activity records, in load order
+        max_records (int): hard upper bound of the sample size
+        rare_size (int): strata with at most this many records are kept whole while the budget allows
+        bucket_seconds (int): time bucket used to spread samples of dense strata over the range
+
+    Returns:
+        dict: "total", "returned", "strata" (exact counts per type/subtype), "bursts" (with exact counts per
+            burst bucket) and the sampled "records".
+    """
+    times = [record_time(record) for record in records]
+    strata = defaultdict(list)
+    for record_id, record in enumerate(records):
+        strata[stratum_of(record)].append(record_id)
+
+    bursts = detect_bursts(records)
+    burst_buckets = {(burst["type"], burst["subtype"], bucket) for burst in bursts for bucket in burst["buckets"]}
+
+    burst_bucket_counts = Counter()
+    for record_id, record in enumerate(records):
+        ts = times[record_id]
+        if ts is not None:
+            key = stratum_of(record) + (int(ts // BURST_BUCKET_SECONDS),)
+            if key in burst_buckets:
+                burst_bucket_counts[key] += 1
+
+    rare, dense = [], {}
+    in_burst = defaultdict(list)
+    for stratum, ids in strata.items():
+        if len(ids) <= rare_size:
+            rare.append(ids)
+            continue
+        rest = []
+        for record_id in ids:
+            ts = times[record_id]
+            key = None if ts is None else stratum + (int(ts // BURST_BUCKET_SECONDS),)
+            if key in burst_buckets:
+                in_burst[key].append(record_id)
+            else:
+                rest.append(record_id)
+        dense[stratum] = rest
+
+    keep = _sample_groups(rare, max_records)
+    budget = max_records - len(keep)
+    dense_total = sum(len(ids) for ids in dense.values())
+    burst_groups = [_evenly_spaced(ids, BURST_RECORDS_PER_BUCKET) for ids in in_burst.values()]
+    burst_budget = int(budget * BURST_BUDGET_SHARE) if dense_total else budget
+    keep += _sample_groups(burst_groups, burst_budget)
+
+    budget = max_records - len(keep)
+    stratum_groups = list(dense.values())
+    for ids, quota in zip(stratum_groups, _allocate([len(ids) for ids in stratum_groups], budget)):
+        if not quota:
+            continue
+        buckets = defaultdict(list)
+        for record_id in ids:
+            ts = times[record_id]
+            buckets[None if ts is None else int(ts // bucket_seconds)].append(record_id)
+        bucket_ids = list(buckets.values())
+        for sampled, bucket_quota in zip(bucket_ids, _allocate([len(b) for b in bucket_ids], quota)):
+            keep.extend(_evenly_spaced(sampled, bucket_quota))
+
+    kept_per_stratum = defaultdict(int)
+    for record_id in keep:
+        kept_per_stratum[stratum_of(records[record_id])] += 1
+
+    summary = []
+    for stratum, ids in sorted(strata.items(), key=lambda item: len(item[1]), reverse=True):
+        stratum_times = [times[i] for i in ids if times[i] is not None]
+        summary.append({
+            "UseractivityType": stratum[0],
+            "UseractivitySubType": stratum[1],
+            "count": len(ids),
+            "returned": kept_per_stratum[stratum],
+            "first_seen": format_timestamp(min(stratum_times)) if stratum_times else None,
+            "last_seen": format_timestamp(max(stratum_times)) if stratum_times else None,
+        })
+
+    burst_summary = []
+    for burst in bursts:
+        described = describe_burst(burst)
+        stratum = (burst["type"], burst["subtype"])
+        described["bucket_counts"] = [
+            {"start": format_timestamp(bucket * BURST_BUCKET_SECONDS), "count": burst_bucket_counts[stratum + (bucket,)]}
+            for bucket in burst["buckets"]
+        ]
+        burst_summary.append(described)
+
+    return {
+        "sampled": True,
+        "total": len(records),
+        "returned": len(keep),
+        "strata": summary,
+        "bursts": burst_summary,
+        "records": [record_dict(records[i]) for i in sorted(keep)],
+    }
@@ -0,0 +1,167 @@
+import bisect
+import re
+
+_TOKEN_RE = re.compile(r"\w+(?:[.\-]\w+)*")
+_QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def tokenize(text: str):
+    """
+    Splits text into lower-case tokens. Dotted / dashed values such as OS versions ("17.4.1") stay one token;
+    "key:value" and "key=value" pairs are split into their parts.
+    """
+    return [token.lower() for token in _TOKEN_RE.findall(text or "")]
+
+
+class InvertedIndex:
+    """
+    Token -> (record ids, positions) index over the Data payloads of a loaded dataset.
+
+    Records are added incrementally, in load order, while rows stream in from Bigtable. Supports term,
+    phrase ("timed out") and prefix (pair*) queries, optionally restricted to a time range.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._times = []
+        self._times_sorted = True
+        self._vocabulary = []
+        self._vocabulary_dirty = False
+
+    def __len__(self):
+        return len(self._times)
+
+    def add(self, record_id: int, timestamp, text: str):
+        """
+        Indexes one record. record_id must be the next id, i.e. equal to the number of records added so far.
+        """
+        if record_id != len(self._times):
+            raise ValueError(f"records must be added in order, expected id {len(self._times)} got {record_id}")
+        if timestamp is not None and self._times and self._times[-1] is not None and timestamp < self._times[-1]:
+            self._times_sorted = False
+        if timestamp is None:
+            self._times_sorted = False
+        self._times.append(timestamp)
+
+        # Postings are parallel lists of ascending record ids and their token positions, so a
+        # time window (a contiguous id range when times are sorted) can be cut out with bisect.
+        for position, token in enumerate(tokenize(text)):
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = ([], [])
+                self._vocabulary_dirty = True
+            ids, positions = postings
+            if ids and ids[-1] == record_id:
+                positions[-1].append(position)
+            else:
+                ids.append(record_id)
+                positions.append([position])
+
+    def _prefix_tokens(self, prefix: str):
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        tokens = []
+        for token in self._vocabulary[start:]:
+            if not token.startswith(prefix):
+                break
+            tokens.append(token)
+        return tokens
+
+    @staticmethod
+    def _window_ids(postings, window):
+        ids = postings[0]
+        if window is None:
+            return ids
+        lo, hi = window
+        return ids[bisect.bisect_left(ids, lo):bisect.bisect_left(ids, hi)]
+
+    def _term(self, term: str, window):
+        # Unquoted terms are tokenized like the indexed text: "error:" is "error", "os=17.4.1" the phrase "os 17.4.1".
+        return self._match_tokens(tokenize(term), window, prefix=term.endswith("*"))
+
+    def _phrase(self, phrase: str, window):
+        return self._match_tokens(tokenize(phrase), window)
+
+    @staticmethod
+    def _positions(group, record_id):
+        found = set()
+        for ids, positions in group:
+            i = bisect.bisect_left(ids, record_id)
+            if i < len(ids) and ids[i] == record_id:
+                found.update(positions[i])
+        return found
+
+    def _match_tokens(self, tokens, window, prefix: bool = False):
+        """
+        Returns the ids of records containing the tokens as consecutive words. With prefix, the last token only
+        has to be the start of a word.
+        """
+        if not tokens:
+            return set()
+        groups = [[token] for token in tokens]
+        if prefix:
+            groups[-1] = self._prefix_tokens(tokens[-1])
+        postings = [[self._postings[token] for token in group if token in self._postings] for group in groups]
+        if any(not group for group in postings):
+            return set()
+
+        candidates = None
+        for group in postings:
+            ids = set()
+            for p in group:
+                ids.update(self._window_ids(p, window))
+            candidates = ids if candidates is None else candidates & ids
+        if len(postings) == 1:
+            return candidates
+
+        matches = set()
+        for record_id in candidates:
+            following = [self._positions(group, record_id) for group in postings[1:]]
+            for start in self._positions(postings[0], record_id):
+                if all(start + offset + 1 in positions for offset, positions in enumerate(following)):
+                    matches.add(record_id)
+                    break
+        return matches
+
+    def _time_window(self, start_time, end_time):
+        """Returns (lo, hi) id bounds when times are sorted, else None."""
+        if not self._times_sorted:
+            return None
+        lo = 0 if start_time is None else bisect.bisect_left(self._times, start_time)
+        hi = len(self._times) if end_time is None else bisect.bisect_right(self._times, end_time)
+        return lo, hi
+
+    def search(self, query: str, start_time=None, end_time=None):
+        """
+        Returns the sorted record ids matching every part of the query (AND semantics).
+
+        Args:
+            query (str): words, "quoted phrases" and prefix* terms
+            start_time (float): optional inclusive lower bound in unix seconds
+            end_time (float): optional inclusive upper bound in unix seconds
+        """
+        restricted = start_time is not None or end_time is not None
+        window = self._time_window(start_time, end_time) if restricted else None
+
+        ids = None
+        for phrase, term in _QUERY_RE.findall(query):
+            matched = self._phrase(phrase, window) if phrase else self._term(term, window)
+            ids = matched if ids is None else ids & matched
+            if not ids:
+                return []
+        if ids is None:
+            return []
+
+        if restricted and window is None:
+            ids = [
+                i for i in ids
+                if self._times[i] is not None
+                and (start_time is None or self._times[i] >= start_time)
+                and (end_time is None or self._times[i] <= end_time)
+            ]
+        return sorted(ids)
+
+    def timestamp(self, record_id: int):
+        return self._times[record_id]
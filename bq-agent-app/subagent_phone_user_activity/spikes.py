@@ -0,0 +1,143 @@
+import math
+from collections import defaultdict
+
+from .records import format_timestamp, record_time
+
+# A spike is an abnormally large record count of the same UseractivitySubType within a short period of time.
+BURST_BUCKET_SECONDS = 60
+BURST_MIN_COUNT = 10
+BURST_THRESHOLD_STDDEV = 3.0
+
+
+def stratum_of(record):
+    return (record.get("UseractivityType"), record.get("UseractivitySubType"))
+
+
+def _flag_buckets(counts, n_buckets, min_count, threshold):
+    """
+    Returns the buckets of one stratum whose count is far above the stratum's own per-bucket rate.
+    Empty buckets anywhere in the loaded range count as zeros.
+    """
+    total = sum(counts.values())
+    mean = total / n_buckets
+    variance = sum(c * c for c in counts.values()) / n_buckets - mean * mean
+    limit = mean + threshold * math.sqrt(max(variance, 0.0))
+    return sorted(b for b, c in counts.items() if c >= min_count and c > limit)
+
+
+def detect_bursts(records, bucket_seconds: int = BURST_BUCKET_SECONDS, min_count: int = BURST_MIN_COUNT,
+                  threshold: float = BURST_THRESHOLD_STDDEV):
+    """
+    Finds bursts of the same UseractivityType / UseractivitySubType.
+
+    Records are counted per stratum and time bucket; a bucket is a burst when it holds at least min_count
+    records and more than threshold standard deviations above the stratum's mean bucket count over the
+    whole loaded range.
+    Adjacent burst buckets are merged.
+
+    Returns:
+        list: dicts with type, subtype, start, end (unix seconds, end exclusive), count and buckets
+            (the flagged bucket numbers), largest count first.
+    """
+    counts = defaultdict(lambda: defaultdict(int))
+    for record in records:
+        ts = record_time(record)
+        if ts is not None:
+            counts[stratum_of(record)][int(ts // bucket_seconds)] += 1
+
+    if not counts:
+        return []
+    all_buckets = [bucket for stratum_counts in counts.values() for bucket in stratum_counts]
+    n_buckets = max(all_buckets) - min(all_buckets) + 1
+
+    bursts = []
+    for stratum, stratum_counts in counts.items():
+        current = None
+        for bucket in _flag_buckets(stratum_counts, n_buckets, min_count, threshold):
+            if current and bucket == current["buckets"][-1] + 1:
+                current["buckets"].append(bucket)
+                current["count"] += stratum_counts[bucket]
+                continue
+            current = {"type": stratum[0], "subtype": stratum[1], "buckets": [bucket], "count": stratum_counts[bucket]}
+            bursts.append(current)
+
+    for burst in bursts:
+        burst["start"] = burst["buckets"][0] * bucket_seconds
+        burst["end"] = (burst["buckets"][-1] + 1) * bucket_seconds
+    bursts.sort(key=lambda b: b["count"], reverse=True)
+    return bursts
+
+
+def describe_burst(burst):
+    """
+    Json-friendly summary of a burst for tool output.
+    """
+    return {
+        "UseractivityType": burst["type"],
+        "UseractivitySubType": burst["subtype"],
+        "count": burst["count"],
+        "start": format_timestamp(burst["start"]),
+        "end": format_timestamp(burst["end"]),
+    }
+
+
+class SpikeDetector:
+    """
+    Incremental version of detect_bursts for live tailing.
+
+    Keeps per stratum bucket counts plus running sums, so adding a record and checking its bucket is O(1)
+    instead of re-reading the whole range. Each (stratum, bucket) is alerted at most once.
+    """
+
+    def __init__(self, bucket_seconds: int = BURST_BUCKET_SECONDS, min_count: int = BURST_MIN_COUNT,
+                 threshold: float = BURST_THRESHOLD_STDDEV):
+        self.bucket_seconds = bucket_seconds
+        self.min_count = min_count
+        self.threshold = threshold
+        self._counts = defaultdict(lambda: defaultdict(int))
+        self._totals = defaultdict(int)
+        self._squares = defaultdict(int)
+        self._first_bucket = None
+        self._last_bucket = None
+        self._alerted = set()
+        self._touched = set()
+
+    def add(self, record):
+        ts = record_time(record)
+        if ts is None:
+            return
+        stratum = stratum_of(record)
+        bucket = int(ts // self.bucket_seconds)
+        count = self._counts[stratum][bucket]
+        self._counts[stratum][bucket] = count + 1
+        self._totals[stratum] += 1
+        self._squares[stratum] += 2 * count + 1
+        self._first_bucket = bucket if self._first_bucket is None else min(self._first_bucket, bucket)
+        self._last_bucket = bucket if self._last_bucket is None else max(self._last_bucket, bucket)
+        self._touched.add((stratum, bucket))
+
+    def check(self):
+        """
+        Returns alerts (json-friendly burst dicts) for buckets touched since the last check that became bursts.
+        """
+        if self._first_bucket is None:
+            return []
+        n_buckets = self._last_bucket - self._first_bucket + 1
+        alerts = []
+        for stratum, bucket in sorted(self._touched, key=lambda item: item[1]):
+            if (stratum, bucket) in self._alerted:
+                continue
+            count = self._counts[stratum][bucket]
+            mean = self._totals[stratum] / n_buckets
+            variance = self._squares[stratum] / n_buckets - mean * mean
+            if count >= self.min_count and count > mean + self.threshold * math.sqrt(max(variance, 0.0)):
+                self._alerted.add((stratum, bucket))
+                alerts.append(describe_burst({
+                    "type": stratum[0],
+                    "subtype": stratum[1],
+                    "count": count,
+                    "start": bucket * self.bucket_seconds,
+                    "end": (bucket + 1) * self.bucket_seconds,
+                }))
+        self._touched.clear()
+        return alerts
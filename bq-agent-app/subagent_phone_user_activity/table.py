@@ -0,0 +1,28 @@
+from functools import lru_cache
+
+PROJECT_ID="qwiklabs-asl-01-e660751acd56"
+BT_INSTANCE_ID="phonelogs"
+BT_TABLE_ID="phone_user_activity"
+
+COLUMN_FAMILY_ID = "raw"
+COLUMN_ID = "Raw".encode("utf-8")
+
+
+@lru_cache(maxsize=None)
+def get_table(table_id: str = BT_TABLE_ID):
+    """
+    Returns a Table handle on a shared Cloud Bigtable client, so tools do not open a new channel on every call.
+    The client library is imported here, on first use, to keep importing the agent cheap.
+    """
+    from google.cloud import bigtable
+
+    client = bigtable.Client(project=PROJECT_ID)
+    instance = client.instance(BT_INSTANCE_ID)
+    return instance.table(table_id)
+
+
+def raw_value(row) -> bytes:
+    """
+    Returns the latest raw:Raw cell value of a row.
+    """
+    return row.cells[COLUMN_FAMILY_ID][COLUMN_ID][0].value
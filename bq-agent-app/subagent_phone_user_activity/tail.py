@@ -0,0 +1,124 @@
+import asyncio
+
+from .dataset import is_registered, make_dataset_key, start_dataset
+from .progress import report_progress
+from .read_executor import read_rows_resilient
+from .records import record_time
+from .rowkeys import encode_key, prefix_range, time_range
+from .spikes import SpikeDetector
+from .table import get_table, raw_value
+
+# Live tail of one patient / record type. A cursor holds the last row key seen; every poll reads only keys
+# after it, appends the new records to the dataset and feeds them to an incremental spike detector, so the
+# cost of a poll is proportional to the number of new records rather than the whole day.
+#
+# A dataset rebuilt from 'phone_logs' has no row keys, so the cursor then comes from the last row key kept
+# in the session's 'lookup', or else from the newest loaded record; it never restarts from start_time
+# while records are loaded, which would append the whole range a second time.
+TAIL_POLL_SECONDS = 30
+# tail_async runs indefinitely; once its dataset holds this many records it starts a fresh one.
+TAIL_MAX_RECORDS = 100000
+
+_tails = {}
+
+
+class LogTail:
+    """
+    Cursor over the rows of one patient / record type that are newer than the last row seen.
+    """
+
+    def __init__(self, patient_id: str, recordType: str, start_time: int, dataset=None, last_row_key: str = None):
+        self.patient_id = patient_id
+        self.recordType = recordType
+        if dataset is None:
+            dataset = start_dataset(make_dataset_key(patient_id, recordType, start_time, "tail"))
+        self.dataset = dataset
+        self.detector = SpikeDetector()
+        for record in self.dataset.records:
+            self.detector.add(record)
+        self.detector.check()
+
+        last_keys = [key for key in self.dataset.row_keys if key]
+        times = [ts for ts in map(record_time, self.dataset.records) if ts is not None]
+        if last_keys:
+            self.cursor, self.cursor_inclusive = last_keys[-1], False
+        elif last_row_key:
+            self.cursor, self.cursor_inclusive = last_row_key, False
+        elif times:
+            # Continue after every row of the newest loaded second.
+            newest = int(max(times))
+            self.cursor, self.cursor_inclusive = time_range(patient_id, recordType, newest, newest).end_key, True
+        else:
+            self.cursor, self.cursor_inclusive = encode_key(patient_id, recordType, start_time), True
+
+    def trim(self, max_records: int = TAIL_MAX_RECORDS):
+        """
+        Replaces the dataset with an empty one once it holds more than max_records records. The cursor and the
+        spike detector carry on, so no rows are read twice and bursts keep their baseline.
+        """
+        if len(self.dataset) > max_records:
+            self.dataset = start_dataset(self.dataset.key)
+
+    def poll(self):
+        """
+        Reads the rows after the cursor, adds them to the dataset and spike detector, and advances the cursor.
+
+        Returns:
+            tuple: (list of new raw json strings, list of spike alerts)
+        """
+        end_key = prefix_range(self.patient_id, self.recordType).end_key
+        new_rows = []
+        for row in read_rows_resilient(get_table(), self.cursor, end_key, start_inclusive=self.cursor_inclusive):
+            raw = raw_value(row).decode("utf-8")
+            row_key = row.row_key.decode("utf-8")
+            new_rows.append(raw)
+            record_id = self.dataset.add(raw, row_key)
+            if record_id is not None:
+                self.detector.add(self.dataset.records[record_id])
+            self.cursor, self.cursor_inclusive = row_key, False
+        alerts = self.detector.check()
+        if new_rows or alerts:
+            report_progress("tail", f"{len(new_rows)} new records, {len(alerts)} spike alerts", rows=len(new_rows), alerts=alerts)
+        return new_rows, alerts
+
+
+def get_tail(dataset, patient_id: str, recordType: str, start_time: int, last_row_key: str = None) -> LogTail:
+    """
+    Returns the tail attached to a loaded dataset, creating it on first use.
+    """
+    # Tails of datasets the registry has evicted would keep them alive; drop them.
+    for key in [key for key, tail in _tails.items() if not is_registered(tail.dataset)]:
+        del _tails[key]
+    tail = _tails.get(dataset.key)
+    if tail is None or tail.dataset is not dataset:
+        tail = _tails[dataset.key] = LogTail(patient_id, recordType, start_time, dataset, last_row_key)
+    return tail
+
+
+async def tail_async(patient_id: str, recordType: str, start_time: int, on_alert=None, interval: float = TAIL_POLL_SECONDS,
+                     stop_event=None):
+    """
+    Polls for new records every `interval` seconds until stop_event is set, pushing spike alerts to on_alert.
+
+    Args:
+        patient_id (str): a UUID for a given patient
+        recordType (str): a label for the record type
+        start_time (int): a timestamp in unix seconds to start tailing from
+        on_alert (callable): called with each alert dict; alerts are printed when not given
+        interval (float): seconds between polls
+        stop_event (asyncio.Event): optional event that ends the loop
+    """
+    tail = LogTail(patient_id, recordType, start_time)
+    while stop_event is None or not stop_event.is_set():
+        new_rows, alerts = await asyncio.to_thread(tail.poll)
+        tail.trim()
+        for alert in alerts:
+            if on_alert:
+                on_alert(alert)
+            else:
+                print(f"SPIKE: {alert['count']} x {alert['UseractivityType']} / {alert['UseractivitySubType']} "
+                      f"between {alert['start']} and {alert['end']}")
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=interval) if stop_event else await asyncio.sleep(interval)
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The agent packages live directly under bq-agent-app (the directory adk web is started from).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,56 @@
+import json
+from datetime import timedelta
+
+import pytest
+
+from subagent_phone_user_activity.decoder import _iso_seconds, decode_batch, decode_record
+from subagent_phone_user_activity.records import parse_timestamp
+
+UTC_10_00_30 = 1746093630.0
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("2025-05-01T10:00:30Z", UTC_10_00_30),
+    ("2025-05-01T10:00:30+00:00", UTC_10_00_30),
+    ("2025-05-01T10:00:30", UTC_10_00_30),
+    ("2025-05-01T10:00:30+07:00", UTC_10_00_30 - 7 * 3600),
+    ("2025-05-01T10:00:30+0700", UTC_10_00_30 - 7 * 3600),
+    ("2025-05-01T10:00:30-0530", UTC_10_00_30 + 5.5 * 3600),
+    ("2025-05-01T10:00:30-05:30", UTC_10_00_30 + 5.5 * 3600),
+    ("2025-05-01T10:00:30.1234567Z", UTC_10_00_30 + 0.1234567),
+    ("2025-05-01T10:00:30.1234567-07:00", UTC_10_00_30 + 0.1234567 + 7 * 3600),
+    ("2025-05-01T10:00:30.5+0700", UTC_10_00_30 + 0.5 - 7 * 3600),
+])
+def test_iso_seconds(text, expected):
+    assert _iso_seconds(text) == pytest.approx(expected, abs=1e-6)
+    assert _iso_seconds(text) == pytest.approx(parse_timestamp(text), abs=1e-6)
+
+
+@pytest.mark.parametrize("text", [None, "", "not a time", "2025-05-01T10:00:3xZ", 1746093630])
+def test_iso_seconds_falls_back_to_parse_timestamp(text):
+    assert _iso_seconds(text) == parse_timestamp(text)
+
+
+def test_decode_record():
+    record = decode_record(json.dumps({
+        "RecordedSystemTime": "2025-05-01T17:00:30.1234567Z",
+        "RecordedDisplayTime": "2025-05-01T10:00:30.1234567-0700",
+        "UseractivitySubType": "Pairing Failed",
+        "Data": {"os": "17.4.1"},
+    }).encode())
+
+    assert record.system_ts == pytest.approx(record.display_ts)
+    assert record.display_tz.utcoffset(None) == timedelta(hours=-7)
+    assert record.get("UseractivitySubType") == "Pairing Failed"
+    assert record["Data"] == {"os": "17.4.1"}
+    assert record.get("Stream", "unknown") == "unknown"
+    assert record.get("NotAField") is None
+    assert "Stream" not in record.to_dict()
+    with pytest.raises(KeyError):
+        record["NotAField"]
+
+
+def test_decode_batch_keeps_one_entry_per_value():
+    records = decode_batch([b'{"Stream": "iOS"}', b"not json", b"[1, 2]", '{"Stream": "Android"}'])
+
+    assert [r and r.Stream for r in records] == ["iOS", None, None, "Android"]
@@ -0,0 +1,119 @@
+import json
+import os
+
+import pytest
+
+from subagent_phone_user_activity import export
+from subagent_phone_user_activity.export import check_path_part, day_ranges, resolve_export_dir
+
+DAY = 86400
+MAY_1 = 1746057600
+
+
+def test_day_ranges_cover_whole_days():
+    assert day_ranges(MAY_1 + 36000, MAY_1 + DAY - 1) == [(MAY_1, MAY_1 + DAY)]
+    assert day_ranges(MAY_1 + 36000, MAY_1 + DAY) == [(MAY_1, MAY_1 + DAY), (MAY_1 + DAY, MAY_1 + 2 * DAY)]
+
+
+def test_export_dir_stays_under_root(tmp_path):
+    root = str(tmp_path)
+    assert resolve_export_dir("", root) == os.path.realpath(root)
+    assert resolve_export_dir("pairing", root) == os.path.join(os.path.realpath(root), "pairing")
+    for output_dir in ("..", "../elsewhere", "/etc", "a/../../b"):
+        with pytest.raises(ValueError):
+            resolve_export_dir(output_dir, root)
+
+
+@pytest.mark.parametrize("patient_id", ["", "../etc", "a/b", "a\\b", "a#b"])
+def test_invalid_patient_ids_are_rejected(patient_id):
+    with pytest.raises(ValueError):
+        check_path_part("patient_id", patient_id)
+
+
+class _Row:
+    def __init__(self, row_key, value):
+        self.row_key = row_key.encode()
+        self.value = value
+
+
+def _rows(day_start, n):
+    return [
+        _Row(f"p#UserActivityRecord#{day_start + i * 3600}", json.dumps({
+            "RecordedSystemTime": f"2025-05-01T{i:02d}:00:00Z",
+            "UseractivityType": "Networking",
+            "Data": {"os": "17.4.1"},
+        }).encode())
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def reader(monkeypatch):
+    calls = []
+
+    def install(rows, fail=False):
+        def read_rows(table, start_key, end_key, **kwargs):
+            calls.append((start_key, end_key))
+            for row in rows:
+                if start_key.encode() <= row.row_key < end_key.encode():
+                    yield row
+            if fail:
+                raise OSError("read failed")
+
+        monkeypatch.setattr(export, "read_rows_resilient", read_rows)
+        monkeypatch.setattr(export, "raw_value", lambda row: row.value)
+        return calls
+
+    return install
+
+
+def test_export_range_writes_the_day_in_row_groups(tmp_path, reader):
+    pq = pytest.importorskip("pyarrow.parquet")
+    reader(_rows(MAY_1, 5) + _rows(MAY_1 + DAY, 1) + [_Row(f"p#UserActivityRecord#{MAY_1 + 1}", b"not json")])
+
+    result = export.export_range(None, "p", "UserActivityRecord", MAY_1, MAY_1 + DAY, str(tmp_path), row_group_size=2)
+
+    assert result == {"path": result["path"], "rows": 5, "skipped": False, "complete": True}
+    assert result["path"].endswith(os.path.join("patient_id=p", "record_type=UserActivityRecord", "date=2025-05-01", "part-00000.parquet"))
+    parquet = pq.ParquetFile(result["path"])
+    assert parquet.num_row_groups == 3
+    assert parquet.schema_arrow.remove_metadata() == export.export_schema()
+    table = parquet.read()
+    assert table.column("key_time").to_pylist() == [MAY_1 + i * 3600 for i in range(5)]
+    assert table.column("RecordedSystemTime").to_pylist()[1].hour == 1
+    assert table.column("Data").to_pylist()[0] == '{"os": "17.4.1"}'
+    assert not os.path.exists(result["path"] + ".tmp")
+
+
+def test_complete_days_are_skipped_and_partial_days_rewritten(tmp_path, reader, monkeypatch):
+    pytest.importorskip("pyarrow")
+    rows = _rows(MAY_1, 2)
+    calls = reader(rows)
+    monkeypatch.setattr(export.time, "time", lambda: MAY_1 + 12 * 3600)
+
+    partial = export.export_range(None, "p", "UserActivityRecord", MAY_1, MAY_1 + DAY, str(tmp_path))
+    rows.extend(_rows(MAY_1, 4)[2:])
+    monkeypatch.setattr(export.time, "time", lambda: MAY_1 + 3 * DAY)
+    rewritten = export.export_range(None, "p", "UserActivityRecord", MAY_1, MAY_1 + DAY, str(tmp_path))
+    skipped = export.export_range(None, "p", "UserActivityRecord", MAY_1, MAY_1 + DAY, str(tmp_path))
+
+    assert (partial["rows"], partial["complete"]) == (2, False)
+    assert (rewritten["rows"], rewritten["complete"], rewritten["skipped"]) == (4, True, False)
+    assert skipped["skipped"] and len(calls) == 2
+
+
+def test_failed_export_leaves_no_file_and_other_files_alone(tmp_path, reader):
+    pytest.importorskip("pyarrow")
+    reader(_rows(MAY_1, 3), fail=True)
+    path = export._partition_path(str(tmp_path), "p", "UserActivityRecord", MAY_1)
+    os.makedirs(os.path.dirname(path))
+    other = os.path.join(os.path.dirname(path), "mine.parquet")
+    open(other, "wb").close()
+
+    with pytest.raises(OSError):
+        export.export_range(None, "p", "UserActivityRecord", MAY_1, MAY_1 + DAY, str(tmp_path))
+    reader(_rows(MAY_1, 3))
+    result = export.export_range(None, "p", "UserActivityRecord", MAY_1, MAY_1 + DAY, str(tmp_path))
+
+    assert result["rows"] == 3
+    assert os.path.exists(other)
@@ -0,0 +1,94 @@
+import json
+import re
+import time
+from collections import Counter
+
+from subagent_phone_user_activity import fleet
+from subagent_phone_user_activity.table import COLUMN_FAMILY_ID, COLUMN_ID
+
+START = 1746141133
+
+
+class _Cell:
+    def __init__(self, value):
+        self.value = value
+
+
+class _Row:
+    def __init__(self, row_key, values):
+        self.row_key = row_key.encode()
+        self.cells = {COLUMN_FAMILY_ID: {COLUMN_ID: [_Cell(json.dumps(values).encode())]}}
+
+
+class _Sample:
+    def __init__(self, row_key):
+        self.row_key = row_key
+
+
+def _value(**fields):
+    return json.dumps(fields).encode()
+
+
+def test_json_field_regex_matches_the_whole_value():
+    pattern = re.compile(fleet._json_field_regex("TransmitterNumber", "8AB12C"))
+
+    assert pattern.fullmatch(_value(TransmitterNumber="8AB12C", Stream="iOS"))
+    assert pattern.fullmatch(b'{"TransmitterNumber": "8AB12C"}')
+    assert not pattern.fullmatch(_value(TransmitterNumber="8AB12CD"))
+    assert not pattern.fullmatch(_value(Stream="8AB12C"))
+    assert re.compile(fleet._json_field_regex("Stream", "a.b")).fullmatch(_value(Stream="a.b"))
+    assert not re.compile(fleet._json_field_regex("Stream", "a.b")).fullmatch(_value(Stream="axb"))
+
+
+def test_shard_ranges_cover_the_whole_table():
+    class Table:
+        def sample_row_keys(self):
+            return [_Sample(b"m"), _Sample(b""), _Sample(b"t")]
+
+    assert fleet.shard_ranges(Table()) == [(None, b"m"), (b"m", b"t"), (b"t", None)]
+
+
+def test_add_row_counts_every_row_and_filters_time_and_subtype():
+    partial = fleet._new_partial()
+    rows = [
+        _Row(f"p1#UserActivityRecord#{START}", {"UseractivitySubType": "Pairing Failed"}),
+        _Row(f"p1#UserActivityRecord#{START + 60}", {"UseractivitySubType": "Pairing Succeeded"}),
+        _Row(f"p2#UserActivityRecord#{START + 30}", {"UseractivitySubType": "Sensor Started"}),
+        _Row(f"p2#UserActivityRecord#{START + 9999}", {"UseractivitySubType": "Pairing Failed"}),
+        _Row("not-a-key", {}),
+    ]
+    for row in rows:
+        fleet._add_row(partial, row, START, START + 3600, "pairing")
+
+    assert partial["rows_scanned"] == 5
+    assert partial["matched"] == 2
+    assert list(partial["patients"]) == ["p1"]
+    assert partial["patients"]["p1"]["first"] == START
+    assert partial["patients"]["p1"]["last"] == START + 60
+
+
+def test_merge_combines_partials():
+    total, first, second = fleet._new_partial(), fleet._new_partial(), fleet._new_partial()
+    first.update(rows_scanned=3, matched=2)
+    first["patients"]["p1"] = {"count": 2, "first": 10, "last": 20, "subtypes": Counter(a=2)}
+    second.update(rows_scanned=4, matched=1, complete=False, failed_shards=1)
+    second["patients"]["p1"] = {"count": 1, "first": 5, "last": 15, "subtypes": Counter(b=1)}
+
+    fleet._merge(total, first)
+    fleet._merge(total, second)
+
+    assert (total["rows_scanned"], total["matched"], total["complete"], total["failed_shards"]) == (7, 3, False, 1)
+    assert total["patients"]["p1"] == {"count": 3, "first": 5, "last": 20, "subtypes": Counter(a=2, b=1)}
+
+
+def test_shard_queued_past_the_deadline_is_not_read(monkeypatch):
+    def read_rows(*args, **kwargs):
+        raise AssertionError("no read expected after the deadline")
+
+    monkeypatch.setattr(fleet, "read_rows_resilient", read_rows)
+
+    partial = fleet._scan_shard(None, None, None, None, 0, 0, "", time.monotonic() - 1)
+
+    assert partial["complete"] is False
+    assert partial["skipped_shards"] == 1
+    assert partial["rows_scanned"] == 0
@@ -0,0 +1,60 @@
+from subagent_phone_user_activity import prefetch
+from subagent_phone_user_activity.prefetch import PREFETCH_LATE_DATA_SECONDS, Prefetcher, WindowCache
+
+MAY_1 = 1746057600
+DAY = 86400
+
+
+def test_midnight_to_1159pm_prefetches_the_adjacent_days():
+    previous_day, next_day = Prefetcher.candidates("p", "UserActivityRecord", MAY_1, MAY_1 + DAY - 60)[:2]
+
+    assert previous_day == ("p", "UserActivityRecord", MAY_1 - DAY, MAY_1 - 1)
+    assert next_day == ("p", "UserActivityRecord", MAY_1 + DAY, MAY_1 + 2 * DAY - 1)
+
+
+def test_cached_window_serves_contained_requests():
+    cache = WindowCache()
+    rows = [(f"p#UserActivityRecord#{MAY_1 + i * 30}", b"{}") for i in range(DAY // 30)]
+    assert cache.put(("p", "UserActivityRecord", MAY_1, MAY_1 + DAY - 1), rows, MAY_1 + 2 * DAY)
+
+    served = cache.get(("p", "UserActivityRecord", MAY_1, MAY_1 + DAY - 60))
+
+    assert served == rows[:-1]
+    assert cache.get(("p", "UserActivityRecord", MAY_1, MAY_1 + DAY)) is None
+    assert cache.get(("p", "ErrorLogRecord", MAY_1, MAY_1 + 60)) is None
+    assert cache.snapshot()["hits"] == 1
+
+
+def test_unsettled_windows_are_not_cached():
+    cache = WindowCache()
+    today = ("p", "UserActivityRecord", MAY_1, MAY_1 + DAY - 1)
+    tomorrow = ("p", "UserActivityRecord", MAY_1 + DAY, MAY_1 + 2 * DAY - 1)
+
+    assert not cache.put(today, [("p#UserActivityRecord#%d" % MAY_1, b"{}")], MAY_1 + 12 * 3600)
+    assert not cache.put(tomorrow, [], MAY_1 + 12 * 3600)
+    assert not cache.put(today, [], MAY_1 + DAY - 1 + PREFETCH_LATE_DATA_SECONDS - 1)
+
+    assert cache.get(today) is None
+    assert cache.get(tomorrow) is None
+    assert cache.snapshot()["skipped_unsettled"] == 3
+    assert cache.put(today, [], MAY_1 + DAY - 1 + PREFETCH_LATE_DATA_SECONDS)
+    assert cache.get(today) == []
+
+
+def test_schedule_around_skips_unsettled_windows(monkeypatch):
+    class Prefetch(Prefetcher):
+        def _fetch(self, key):
+            fetched.append(key)
+            self.cache.untrack(key)
+
+    fetched = []
+    monkeypatch.setattr(prefetch.time, "time", lambda: MAY_1 + DAY + 12 * 3600)
+    prefetcher = Prefetch(WindowCache())
+
+    # Yesterday is loaded while today is still running: only the day before yesterday is settled.
+    scheduled = prefetcher.schedule_around("p", "UserActivityRecord", MAY_1, MAY_1 + DAY - 60)
+    prefetcher._pool.shutdown(wait=True)
+
+    assert scheduled == 4
+    assert ("p", "UserActivityRecord", MAY_1 + DAY, MAY_1 + 2 * DAY - 1) not in fetched
+    assert sorted(fetched)[0] == ("p", "ErrorLogRecord", MAY_1, MAY_1 + DAY - 60)
@@ -0,0 +1,58 @@
+import pytest
+
+from subagent_phone_user_activity.query import parse_query, run_query
+
+
+def _record(time=None, subtype="Pairing Transmitter", data=None):
+    record = {"UseractivityType": "Networking", "UseractivitySubType": subtype, "Data": data}
+    if time is not None:
+        record["RecordedSystemTime"] = time
+    return record
+
+
+def test_bucket_groups_records_without_time_last():
+    records = [_record("2025-05-01T10:01:00Z"), _record(), _record("2025-05-01T10:00:30Z")]
+
+    result = run_query(records, "bucket=5m")
+
+    assert [row["count"] for row in result["rows"]] == [2, 1]
+    assert result["rows"][0]["bucket_start"] == "2025-05-01T10:00:00+00:00"
+    assert result["rows"][1]["bucket_start"] is None
+
+
+def test_group_by_json_object_data():
+    records = [_record(data={"b": 1, "a": 2}), _record(data={"a": 2, "b": 1}), _record(data={"a": 3})]
+
+    result = run_query(records, "by data")
+
+    assert result["groups"] == 2
+    assert result["rows"][0] == {"Data": '{"a": 2, "b": 1}', "count": 2}
+
+
+def test_and_inside_quoted_value_is_not_a_separator():
+    records = [_record(data="x and y happened"), _record(data="x only")]
+
+    result = run_query(records, 'filter data~"*x and y*" and type=Networking')
+
+    assert result["matched"] == 1
+    assert len(parse_query('filter data~"*x and y*" and type=Networking')["filters"]) == 2
+
+
+def test_unterminated_quote_is_rejected():
+    with pytest.raises(ValueError):
+        parse_query('filter data~"*x and y*')
+
+
+@pytest.mark.parametrize("query", ["limit 0", "limit -5", "top 0"])
+def test_non_positive_limits_are_rejected(query):
+    with pytest.raises(ValueError):
+        parse_query(query)
+
+
+def test_limit_keeps_the_first_rows():
+    records = [_record(data=str(i)) for i in range(10)]
+
+    result = run_query(records, "limit 3")
+
+    assert [row["Data"] for row in result["rows"]] == ["0", "1", "2"]
+    assert result["truncated"]
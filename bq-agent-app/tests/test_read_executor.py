@@ -0,0 +1,147 @@
+import threading
+import time
+
+import pytest
+
+exceptions = pytest.importorskip("google.api_core.exceptions")
+
+from subagent_phone_user_activity import read_executor  # noqa: E402
+
+KEYS = [f"p#UserActivityRecord#{1746141133 + i}".encode() for i in range(20)]
+
+
+class _Row:
+    def __init__(self, row_key):
+        self.row_key = row_key
+
+
+class _Stream:
+    def __init__(self, rows, before_row):
+        self.rows = rows
+        self.before_row = before_row
+        self.cancelled = threading.Event()
+        self.produced = 0
+
+    def __iter__(self):
+        for i, row in enumerate(self.rows):
+            self.before_row(self, i)
+            if self.cancelled.is_set():
+                return
+            self.produced += 1
+            yield row
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+class _Table:
+    """
+    Serves KEYS for (start_key, end_key, start_inclusive, end_inclusive) row sets. behaviour(call, stream, i)
+    runs before each row of the call-th read_rows call and can sleep or raise.
+    """
+
+    def __init__(self, behaviour=lambda call, stream, i: None):
+        self.behaviour = behaviour
+        self.calls = []
+        self.streams = []
+
+    def read_rows(self, row_set=None, filter_=None):
+        start, end, start_inclusive, end_inclusive = row_set
+        self.calls.append(start)
+        call = len(self.calls)
+        rows = [
+            _Row(key) for key in KEYS
+            if (start is None or key > start or (start_inclusive and key == start))
+            and (end is None or key < end or (end_inclusive and key == end))
+        ]
+        stream = _Stream(rows, lambda s, i: self.behaviour(call, s, i))
+        self.streams.append(stream)
+        return stream
+
+
+@pytest.fixture(autouse=True)
+def fast_reads(monkeypatch):
+    monkeypatch.setattr(read_executor, "_row_set", lambda start, end, start_inclusive, end_inclusive: (start, end, start_inclusive, end_inclusive))
+    monkeypatch.setattr(read_executor, "_backoff", lambda retry: 0)
+    monkeypatch.setattr(read_executor, "MAX_HEDGE_RATIO", 0)
+
+
+def _keys(rows):
+    return [row.row_key for row in rows]
+
+
+def _sleep_until_cancelled(stream, seconds):
+    stream.cancelled.wait(seconds)
+
+
+def test_reads_the_range():
+    assert _keys(read_executor.read_rows_resilient(_Table(), KEYS[3], KEYS[7])) == KEYS[3:7]
+
+
+def test_retry_resumes_after_the_last_row():
+    def behaviour(call, stream, i):
+        if call == 1 and i == 5:
+            raise exceptions.ServiceUnavailable("unavailable")
+
+    table = _Table(behaviour)
+
+    assert _keys(read_executor.read_rows_resilient(table, KEYS[0], None)) == KEYS
+    assert table.calls == [KEYS[0], KEYS[4]]
+
+
+def test_non_retriable_error_is_raised():
+    def behaviour(call, stream, i):
+        raise exceptions.NotFound("no table")
+
+    with pytest.raises(exceptions.NotFound):
+        list(read_executor.read_rows_resilient(_Table(behaviour), None, None))
+
+
+def test_hedged_request_wins_when_the_first_is_slow(monkeypatch):
+    monkeypatch.setattr(read_executor, "MAX_HEDGE_RATIO", 1)
+    monkeypatch.setattr(read_executor, "hedge_delay", lambda: 0.05)
+
+    def behaviour(call, stream, i):
+        if call == 1:
+            _sleep_until_cancelled(stream, 5)
+
+    table = _Table(behaviour)
+    started = time.monotonic()
+
+    assert _keys(read_executor.read_rows_resilient(table, None, None)) == KEYS
+    assert len(table.calls) == 2
+    assert table.streams[0].cancelled.wait(1)
+    assert time.monotonic() - started < 2
+
+
+def test_stalled_stream_is_resumed(monkeypatch):
+    monkeypatch.setattr(read_executor, "READ_IDLE_TIMEOUT_SECONDS", 0.2)
+
+    def behaviour(call, stream, i):
+        if call == 1 and i == 3:
+            _sleep_until_cancelled(stream, 5)
+
+    table = _Table(behaviour)
+
+    assert _keys(read_executor.read_rows_resilient(table, None, None)) == KEYS
+    assert table.calls == [None, KEYS[2]]
+
+
+def test_deadline_is_enforced():
+    def behaviour(call, stream, i):
+        _sleep_until_cancelled(stream, 5)
+
+    with pytest.raises(exceptions.DeadlineExceeded):
+        list(read_executor.read_rows_resilient(_Table(behaviour), None, None, deadline=0.2))
+
+
+def test_slow_consumer_pauses_the_stream(monkeypatch):
+    monkeypatch.setattr(read_executor, "READ_QUEUE_ROWS", 3)
+    table = _Table()
+    rows = read_executor.read_rows_resilient(table, None, None)
+
+    next(rows)
+    time.sleep(0.3)
+
+    assert table.streams[0].produced <= 3 + 2
+    assert len(_keys(rows)) == len(KEYS) - 1
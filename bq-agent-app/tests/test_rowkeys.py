@@ -0,0 +1,102 @@
+import pytest
+
+from subagent_phone_user_activity.rowkeys import (
+    KeyRange,
+    decode_key,
+    encode_key,
+    merge_ranges,
+    prefix_range,
+    split_time_range,
+    time_range,
+)
+
+PATIENT = "010ceb22-8933-4668-974b-0956fceb8644"
+RT = "UserActivityRecord"
+START = 1746141133
+
+
+def _within(key_range, key):
+    return key_range.start_key <= key and (key_range.end_key is None or key < key_range.end_key)
+
+
+def test_encode_decode_round_trip():
+    key = encode_key(PATIENT, RT, START)
+
+    assert key == f"{PATIENT}#{RT}#{START}"
+    assert decode_key(key.encode()) == (PATIENT, RT, START, "")
+    assert decode_key(key + "#2").suffix == "2"
+    assert decode_key(f"{PATIENT}#{RT}#latest").timestamp is None
+    with pytest.raises(ValueError):
+        decode_key("no-separators")
+
+
+def test_ids_with_separator_are_rejected():
+    with pytest.raises(ValueError):
+        encode_key("a#b", RT, START)
+
+
+def test_time_range_includes_the_whole_end_second():
+    key_range = time_range(PATIENT, RT, START, START + 59)
+
+    assert _within(key_range, encode_key(PATIENT, RT, START))
+    assert _within(key_range, encode_key(PATIENT, RT, START + 59))
+    assert _within(key_range, encode_key(PATIENT, RT, START + 59) + "#2")
+    assert not _within(key_range, encode_key(PATIENT, RT, START - 1))
+    assert not _within(key_range, encode_key(PATIENT, RT, START + 60))
+
+
+def test_exclusive_end_stops_before_end_second():
+    key_range = time_range(PATIENT, RT, START, START + 60, end_inclusive=False)
+
+    assert _within(key_range, encode_key(PATIENT, RT, START + 59) + "#2")
+    assert not _within(key_range, encode_key(PATIENT, RT, START + 60))
+
+
+def test_empty_time_range_is_rejected():
+    with pytest.raises(ValueError):
+        time_range(PATIENT, RT, START, START - 1)
+    with pytest.raises(ValueError):
+        time_range(PATIENT, RT, START, START, end_inclusive=False)
+
+
+def test_reversed_layout_sorts_newest_first():
+    newer, older = encode_key(PATIENT, RT, START + 10, reversed_ts=True), encode_key(PATIENT, RT, START, reversed_ts=True)
+    key_range = time_range(PATIENT, RT, START, START + 10, reversed_ts=True)
+
+    assert newer < older
+    assert decode_key(newer, reversed_ts=True).timestamp == START + 10
+    assert _within(key_range, newer) and _within(key_range, older) and _within(key_range, older + "#2")
+    assert not _within(key_range, encode_key(PATIENT, RT, START + 11, reversed_ts=True))
+    assert not _within(key_range, encode_key(PATIENT, RT, START - 1, reversed_ts=True))
+
+
+def test_prefix_range_covers_only_the_patient_and_record_type():
+    key_range = prefix_range(PATIENT, RT)
+
+    assert _within(key_range, encode_key(PATIENT, RT, START))
+    assert not _within(key_range, encode_key(PATIENT, RT + "X", START))
+    assert not _within(key_range, encode_key(PATIENT, "ErrorLogRecord", START))
+
+
+def test_split_time_range_aligns_to_buckets():
+    assert split_time_range(86390, 2 * 86400 + 5, 86400) == [(86390, 86399), (86400, 172799), (172800, 172805)]
+    assert split_time_range(100, 100, 60) == [(100, 100)]
+    assert split_time_range(100, 99, 60) == []
+    with pytest.raises(ValueError):
+        split_time_range(0, 10, 0)
+
+
+def test_split_ranges_cover_the_same_keys():
+    buckets = split_time_range(START, START + 300, 60)
+    ranges = [time_range(PATIENT, RT, start, end) for start, end in buckets]
+
+    assert merge_ranges(ranges) == [time_range(PATIENT, RT, START, START + 300)]
+
+
+def test_merge_ranges():
+    ranges = [KeyRange("c", "d"), KeyRange("a", "b"), KeyRange("b", "c"), KeyRange("e", "f"), KeyRange("e1", "e2")]
+
+    assert merge_ranges(ranges) == [KeyRange("a", "d"), KeyRange("e", "f")]
+    assert merge_ranges([KeyRange("x", None), KeyRange("y", "z")]) == [KeyRange("x", None)]
+    assert merge_ranges([KeyRange(None, "b"), KeyRange("a", "c")]) == [KeyRange(None, "c")]
+    assert merge_ranges([]) == []
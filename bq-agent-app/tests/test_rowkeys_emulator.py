@@ -0,0 +1,71 @@
+"""
+Reads row ranges planned by rowkeys against the Cloud Bigtable emulator:
+
+    gcloud beta emulators bigtable start --host-port=localhost:8086
+    BIGTABLE_EMULATOR_HOST=localhost:8086 python -m pytest tests/test_rowkeys_emulator.py
+"""
+import os
+import uuid
+
+import pytest
+
+from subagent_phone_user_activity.rowkeys import encode_key, split_time_range, time_range, to_row_set
+from subagent_phone_user_activity.table import COLUMN_FAMILY_ID, COLUMN_ID
+
+pytestmark = pytest.mark.skipif(not os.environ.get("BIGTABLE_EMULATOR_HOST"), reason="BIGTABLE_EMULATOR_HOST is not set")
+
+PATIENT = "010ceb22-8933-4668-974b-0956fceb8644"
+RT = "UserActivityRecord"
+START = 1746141133
+
+
+@pytest.fixture
+def table():
+    bigtable = pytest.importorskip("google.cloud.bigtable")
+    from google.cloud.bigtable import column_family
+
+    client = bigtable.Client(project="emulator-project", admin=True)
+    table = client.instance("emulator-instance").table(f"rowkeys-{uuid.uuid4().hex[:8]}")
+    table.create(column_families={COLUMN_FAMILY_ID: column_family.MaxVersionsGCRule(1)})
+    yield table
+    table.delete()
+
+
+def _write(table, keys):
+    rows = []
+    for key in keys:
+        row = table.direct_row(key)
+        row.set_cell(COLUMN_FAMILY_ID, COLUMN_ID, b"{}")
+        rows.append(row)
+    for status in table.mutate_rows(rows):
+        assert status.code == 0
+
+
+def _read(table, ranges):
+    return [row.row_key.decode("utf-8") for row in table.read_rows(row_set=to_row_set(ranges))]
+
+
+def test_last_second_of_range_is_returned(table):
+    inside = [encode_key(PATIENT, RT, START), encode_key(PATIENT, RT, START + 59), encode_key(PATIENT, RT, START + 59) + "#2"]
+    outside = [encode_key(PATIENT, RT, START - 1), encode_key(PATIENT, RT, START + 60), encode_key(PATIENT, "ErrorLogRecord", START)]
+    _write(table, inside + outside)
+
+    assert _read(table, [time_range(PATIENT, RT, START, START + 59)]) == sorted(inside)
+
+
+def test_split_and_overlapping_ranges_return_each_row_once(table):
+    keys = [encode_key(PATIENT, RT, START + i) for i in range(0, 600, 7)]
+    _write(table, keys)
+    ranges = [time_range(PATIENT, RT, start, end) for start, end in split_time_range(START, START + 599, 60)]
+    ranges.append(time_range(PATIENT, RT, START + 100, START + 200))
+
+    assert _read(table, ranges) == sorted(keys)
+
+
+def test_reversed_layout_reads_newest_first(table):
+    keys = [encode_key(PATIENT, RT, START + i, reversed_ts=True) for i in range(10)]
+    _write(table, keys)
+
+    read = _read(table, [time_range(PATIENT, RT, START + 2, START + 7, reversed_ts=True)])
+
+    assert read == [encode_key(PATIENT, RT, START + i, reversed_ts=True) for i in range(7, 1, -1)]
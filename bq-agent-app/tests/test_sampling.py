@@ -0,0 +1,34 @@
+from subagent_phone_user_activity.sampling import stratified_sample
+
+BASE = 1746057600
+
+
+def _record(ts, subtype):
+    return {"UseractivityType": "Networking", "UseractivitySubType": subtype, "RecordedSystemTime": ts}
+
+
+def _records():
+    # 10,000 background records over a day plus one burst of 20,000 pairing failures within a single minute.
+    records = [_record(BASE + i * 8, f"Subtype {i % 7}") for i in range(10000)]
+    records += [_record(BASE + 3600 + i * 0.003, "Pairing Failed") for i in range(20000)]
+    records += [_record(BASE + i * 900, "Rare") for i in range(5)]
+    return records
+
+
+def test_sample_never_exceeds_max_records():
+    for max_records in (2000, 500, 3):
+        sample = stratified_sample(_records(), max_records=max_records)
+        assert sample["returned"] == len(sample["records"]) <= max_records
+
+
+def test_burst_magnitude_is_reported_exactly():
+    sample = stratified_sample(_records())
+
+    burst = next(b for b in sample["bursts"] if b["UseractivitySubType"] == "Pairing Failed")
+    assert burst["count"] == 20000
+    assert sum(bucket["count"] for bucket in burst["bucket_counts"]) == 20000
+    strata = {s["UseractivitySubType"]: s for s in sample["strata"]}
+    assert strata["Pairing Failed"]["count"] == 20000
+    assert 0 < strata["Pairing Failed"]["returned"] <= 50
+    assert strata["Rare"]["returned"] == 5
+    assert all(strata[f"Subtype {i}"]["returned"] > 0 for i in range(7))
@@ -0,0 +1,50 @@
+import pytest
+
+from subagent_phone_user_activity.search_index import InvertedIndex, tokenize
+
+DATA = [
+    "Pairing Transmitter state:disconnected error: timeout",
+    "os=17.4.1, app=1.2.0 connected",
+    "Pairing Transmitter succeeded",
+    "transmitter pairing error: 17.4.1",
+]
+
+
+@pytest.fixture
+def index():
+    index = InvertedIndex()
+    for record_id, text in enumerate(DATA):
+        index.add(record_id, 1746141133 + record_id * 60, text)
+    return index
+
+
+def test_tokenize_splits_key_value_pairs_and_keeps_versions():
+    assert tokenize("state:disconnected os=17.4.1, build-42") == ["state", "disconnected", "os", "17.4.1", "build-42"]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("disconnected", [0]),
+    ("state", [0]),
+    ("state:disconnected", [0]),
+    ("error:", [0, 3]),
+    ("17.4.1,", [1, 3]),
+    ("os=17.4.1", [1]),
+    ('"os=17.4.1"', [1]),
+    ("pairing transmitter", [0, 2, 3]),
+    ('"pairing transmitter"', [0, 2]),
+    ("pair*", [0, 2, 3]),
+    ("os=17.4*", [1]),
+    ("PAIRING error", [0, 3]),
+    ("missing", []),
+])
+def test_search(index, query, expected):
+    assert index.search(query) == expected
+
+
+def test_search_within_time_range(index):
+    assert index.search("pair*", start_time=1746141133 + 60, end_time=1746141133 + 120) == [2]
+
+
+def test_records_must_be_added_in_order():
+    with pytest.raises(ValueError):
+        InvertedIndex().add(1, None, "text")
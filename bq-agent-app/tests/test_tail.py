@@ -0,0 +1,96 @@
+import json
+
+from subagent_phone_user_activity import dataset, tail
+from subagent_phone_user_activity.records import format_timestamp
+
+START = 1746141133
+
+
+class _Row:
+    def __init__(self, row_key, value):
+        self.row_key = row_key
+        self.value = value
+
+
+def _table(n):
+    return [
+        _Row(f"p#UserActivityRecord#{START + i}".encode(), json.dumps({"RecordedSystemTime": format_timestamp(START + i)}).encode())
+        for i in range(n)
+    ]
+
+
+def _install_reader(monkeypatch, rows):
+    def read_rows(table, start_key, end_key, start_inclusive=True, **kwargs):
+        start, end = start_key.encode(), end_key.encode()
+        return [row for row in rows if (row.row_key > start or (start_inclusive and row.row_key == start)) and row.row_key < end]
+
+    monkeypatch.setattr(tail, "read_rows_resilient", read_rows)
+    monkeypatch.setattr(tail, "get_table", lambda: None)
+    monkeypatch.setattr(tail, "raw_value", lambda row: row.value)
+
+
+def _rebuilt_dataset(rows):
+    dataset._datasets.clear()
+    tail._tails.clear()
+    return dataset.get_dataset({"phone_logs": [row.value.decode() for row in rows], "dataset_key": "p#UserActivityRecord#tail-test"})
+
+
+def test_rebuilt_dataset_resumes_after_last_row_key(monkeypatch):
+    rows = _table(100)
+    _install_reader(monkeypatch, rows)
+    loaded = _rebuilt_dataset(rows)
+
+    log_tail = tail.get_tail(loaded, "p", "UserActivityRecord", START, rows[-1].row_key.decode())
+
+    assert log_tail.poll()[0] == []
+    assert len(loaded) == 100
+
+
+def test_rebuilt_dataset_without_cursor_resumes_after_newest_record(monkeypatch):
+    rows = _table(100)
+    _install_reader(monkeypatch, rows)
+    loaded = _rebuilt_dataset(rows)
+    log_tail = tail.get_tail(loaded, "p", "UserActivityRecord", START)
+
+    assert log_tail.poll()[0] == []
+    rows.append(_table(101)[-1])
+    assert len(log_tail.poll()[0]) == 1
+    assert len(loaded) == 101
+
+
+def test_tails_of_evicted_datasets_are_dropped(monkeypatch):
+    rows = _table(3)
+    _install_reader(monkeypatch, rows)
+    tail.get_tail(_rebuilt_dataset(rows), "p", "UserActivityRecord", START)
+    for i in range(dataset.MAX_DATASETS):
+        dataset.start_dataset(f"other-{i}")
+
+    tail.get_tail(dataset.start_dataset("current"), "p", "UserActivityRecord", START)
+
+    assert list(tail._tails) == ["current"]
+
+
+def test_tail_keeps_a_dataset_without_decoded_records(monkeypatch):
+    rows = [_Row(f"p#UserActivityRecord#{START}".encode(), b"not json")]
+    _install_reader(monkeypatch, rows)
+    loaded = _rebuilt_dataset(rows)
+    assert len(loaded) == 0
+
+    log_tail = tail.get_tail(loaded, "p", "UserActivityRecord", START)
+
+    assert log_tail.dataset is loaded
+    assert tail.get_tail(loaded, "p", "UserActivityRecord", START) is log_tail
+
+
+def test_trim_starts_a_fresh_dataset_and_keeps_the_cursor(monkeypatch):
+    rows = _table(10)
+    _install_reader(monkeypatch, rows)
+    log_tail = tail.LogTail("p", "UserActivityRecord", START)
+    log_tail.poll()
+
+    log_tail.trim(max_records=5)
+
+    assert len(log_tail.dataset) == 0
+    assert dataset._datasets[log_tail.dataset.key] is log_tail.dataset
+    rows.extend(_table(12)[10:])
+    assert len(log_tail.poll()[0]) == 2